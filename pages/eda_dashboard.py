@@ -1,9 +1,41 @@
 # import libraries
-import numpy as np
-import pandas as pd
 import plotly.express as px
+import os
+
 import streamlit as st
 
+from src.columnar import EDA_DATA_PATH, load_table
+from src.cube import BILL_HIST_BMI_BIN, BMI_BIN, load_cube
+from src.plots import binned_histogram
+from src.preview import PAGE_SIZES, SORTED_ROWS, PreviewIndex
+
+
+@st.cache_resource
+def load_preview_index(csv_path, csv_mtime):
+    # record batches of the memory-mapped columnar copy of the csv, shared by
+    # every session; the mtime only makes a changed csv miss this cache
+    return PreviewIndex(load_table(csv_path))
+
+
+@st.cache_data(max_entries=32)
+def load_preview_page(csv_path, csv_mtime, page, page_size, filters, sort_by, ascending):
+    # reruns from other widgets reuse the page instead of scanning the batches again
+    return load_preview_index(csv_path, csv_mtime).page(
+        page, page_size, sort_by=sort_by, ascending=ascending, **filters
+    )
+
+
+@st.cache_resource
+def load_data_cube(csv_path, csv_mtime):
+    # pre-aggregated cells behind the kpis and grouped charts
+    return load_cube(csv_path)
+
+
+def filter_label(value):
+    # rows without a value are offered as their own filter option
+    return "Missing" if value is None else str(value)
+
+
 def medical_bill_dashboard():
     # page config
     st.set_page_config(
@@ -36,7 +68,12 @@ def medical_bill_dashboard():
         st.markdown("---")
         
     #load datast
-    df = pd.read_csv("data/cleaned/cleaned_nigeria_medical_insurance_1.csv")
+    try:
+        csv_mtime = os.path.getmtime(EDA_DATA_PATH)
+        cube = load_data_cube(EDA_DATA_PATH, csv_mtime)
+    except Exception as e:
+        st.error(f"Error loading dataset: {e}")
+        st.stop()
     
     # header
     st.title("🏥 Medical Insurance Dashboard")
@@ -50,43 +87,47 @@ def medical_bill_dashboard():
      # age filter
     age_filter = st.sidebar.multiselect(
         "Age",
-        options=sorted(df["age"].unique().tolist()),
-        default=sorted(df["age"].unique().tolist())
+        options=cube.values("age"),
+        default=cube.values("age"),
+        format_func=filter_label
     )
     
-    # bmi filter
-    min_bmi = float(df["bmi"].min())
-    max_bmi = float(df["bmi"].max())
+    # bmi filter, stepped by the cube's bmi bin so every range is exact
+    min_bmi, max_bmi = cube.bmi_bounds()
 
     bmi_range = st.sidebar.slider(
         "Select BMI Range",
         min_value=min_bmi,
         max_value=max_bmi,
-        value=(min_bmi, max_bmi)
+        value=(min_bmi, max_bmi),
+        step=BMI_BIN
     )
     
      # smoker filter
     smoker_filter = st.sidebar.multiselect(
         "Smoker",
-        options=df["smoker"].unique(),
-        default=df["smoker"].unique()
+        options=cube.values("smoker"),
+        default=cube.values("smoker"),
+        format_func=filter_label
     )
     
      # state filter
     state_filter = st.sidebar.multiselect(
         "State",
-        options=sorted(df["state"].unique()),
-        default=sorted(df["state"].unique())
+        options=cube.values("state"),
+        default=cube.values("state"),
+        format_func=filter_label
     )
     
-     # apply filter
-    filtered_df = df[
-        (df["age"].isin(age_filter)) &
-        (df["bmi"] >= bmi_range[0]) &
-        (df["bmi"] <= bmi_range[1]) &
-        (df["smoker"].isin(smoker_filter)) &
-        (df["state"].isin(state_filter))
-    ]
+     # apply filter over the cube cells
+    cube_filters = {
+        "values": {"age": age_filter, "smoker": smoker_filter, "state": state_filter},
+        "ranges": {"bmi": bmi_range},
+    }
+    cube_cells = cube.select(**cube_filters)
+    cube_totals = cube.totals(cube_cells)
+    smoker_groups = cube.group("smoker", cube_cells)
+    state_groups = cube.group("state", cube_cells)
     
     def kpi_card(title, value, icon="📊", color="#2E86C1"):
         st.markdown(
@@ -110,12 +151,12 @@ def medical_bill_dashboard():
     
 
     # kpi summary
-    if not filtered_df.empty:
-        avg_hospital_bill = filtered_df["hospital_bill"].mean()
-        avg_age = filtered_df["age"].mean()
-        avg_bmi = filtered_df["bmi"].mean()
-        percentage_smoker = (filtered_df["smoker"].value_counts(normalize=True) * 100)
-        smoker_percentage = percentage_smoker[0]
+    if cube_totals["count"] > 0:
+        avg_hospital_bill = cube_totals["mean_hospital_bill"]
+        avg_age = cube_totals["mean_age"]
+        avg_bmi = cube_totals["mean_bmi"]
+        smoker_count = smoker_groups["count"].get("Yes", 0)
+        smoker_percentage = smoker_count / cube_totals["count"] * 100
         
     else:
         avg_hospital_bill = 0
@@ -158,22 +199,21 @@ def medical_bill_dashboard():
     left, right = st.columns(2)
     with left:
         st.subheader("Hospital Bill Distribution")
-        fig_hospital_bill = px.histogram(
-            filtered_df,
-            x="hospital_bill",
-            title="Distribution of Hospital Bills"
-        )
+        # bin counts summed from the cube, so only the bars reach the browser
+        bill_counts, bill_edges = cube.bill_histogram(**cube_filters)
+        fig_hospital_bill = binned_histogram(bill_counts, bill_edges)
+        fig_hospital_bill.update_layout(title="Distribution of Hospital Bills", xaxis_title="hospital_bill")
         st.plotly_chart(fig_hospital_bill, use_container_width=True)
+        if bmi_range != (min_bmi, max_bmi):
+            st.caption(f"BMI filter applied in whole bands of {BILL_HIST_BMI_BIN:g} kg/m²")
         fig_hospital_bill.update_layout(showlegend=False)
     
         
     with right:
         st.subheader("Patient Age Distribution")
-        fig_age = px.histogram(
-            filtered_df,
-            x="age",
-            title="Distribution of Age"
-        )
+        age_counts, age_edges = cube.age_histogram(cube_cells)
+        fig_age = binned_histogram(age_counts, age_edges)
+        fig_age.update_layout(title="Distribution of Age", xaxis_title="age")
         st.plotly_chart(fig_age, use_container_width=True)
         fig_age.update_layout(showlegend=False)
     
@@ -188,8 +228,9 @@ def medical_bill_dashboard():
     with left:
         st.subheader("Smoker vs Non-Smoker Distribution")   
         fig_smoker_distribution = px.pie(
-            filtered_df,
+            smoker_groups.reset_index(),
             names="smoker",
+            values="count",
             title="Distribution of Smoker vs Non-Smoker",
             color_discrete_sequence=px.colors.qualitative.Set2,
             hole=0.4 
@@ -199,7 +240,7 @@ def medical_bill_dashboard():
         
         
     with right:
-        smooker_bill = filtered_df.groupby("smoker")["hospital_bill"].mean().reset_index()
+        smooker_bill = smoker_groups["mean_hospital_bill"].rename("hospital_bill").reset_index()
         st.subheader("Average Hospital Bill by Smoker Status")
         fig_bar = px.bar(
             smooker_bill,
@@ -218,7 +259,7 @@ def medical_bill_dashboard():
     left, right = st.columns(2)
     with left:
         st.subheader("Average Hospital Bill by State")
-        state_bill = filtered_df.groupby("state")["hospital_bill"].mean().sort_values(ascending=False).reset_index()
+        state_bill = state_groups["mean_hospital_bill"].rename("hospital_bill").sort_values(ascending=False).reset_index()
         fig_state_bar = px.bar(
             state_bill,
             x="state",
@@ -232,7 +273,8 @@ def medical_bill_dashboard():
         
     with right:
         st.subheader("Correlation Matrix")
-        corr_matrix = filtered_df.select_dtypes(include=['float64', 'int64']).corr()
+        # pearson matrix assembled from the cube's sums of squares and cross-products
+        corr_matrix = cube.correlation(cube_cells)
         fig_corr = px.imshow(
             corr_matrix, 
             title="Correlation Matrix"
@@ -244,7 +286,37 @@ def medical_bill_dashboard():
         
     # data overview
     st.subheader("Data Preview")
-    st.dataframe(filtered_df.head())
+    # rows are only read once the preview is opened, a page at a time from the
+    # memory-mapped batches; the cube already knows how many rows match
+    if st.toggle("Show data preview"):
+        preview = load_preview_index(EDA_DATA_PATH, csv_mtime)
+        n_matching = cube_totals["count"]
+        sort_col, order_col, size_col, page_col = st.columns(4)
+        sort_by = sort_col.selectbox("Sort by", ["Row order"] + preview.columns)
+        sort_by = None if sort_by == "Row order" else sort_by
+        order = order_col.radio("Order", ["Ascending", "Descending"], horizontal=True)
+        page_size = size_col.selectbox("Rows per page", PAGE_SIZES)
+        n_pages = preview.n_pages(n_matching, page_size, sort_by)
+        page = page_col.number_input("Page", min_value=1, max_value=n_pages, value=1, step=1)
+
+        page_df = load_preview_page(
+            EDA_DATA_PATH,
+            csv_mtime,
+            page - 1,
+            page_size,
+            cube_filters,
+            sort_by,
+            order == "Ascending"
+        )
+        st.dataframe(page_df)
+        first_row = (page - 1) * page_size
+        caption = (
+            f"Rows {min(first_row + 1, n_matching):,}–{first_row + len(page_df):,} "
+            f"of {n_matching:,} matching rows"
+        )
+        if sort_by is not None and n_matching > SORTED_ROWS:
+            caption += f" (sorted pages cover the first {SORTED_ROWS:,})"
+        st.caption(caption)
     
     # prediction system
     st.markdown("---") 
@@ -1,7 +1,16 @@
+import tempfile
+
 import streamlit as st
 import numpy as np
 import pandas as pd
-import joblib
+
+from src.explain import load_explainer
+from src.features import (
+    AGE_RANGE, BMI_RANGE, CHILDREN_RANGE, GENDER_OPTIONS, INPUT_COLUMNS, SMOKER_OPTIONS, STATE_OPTIONS
+)
+from src.risk import calculate_risk, risk_codes, risk_counts, risk_labels
+from src.quote_table import load_quote_table
+from src.scoring import XG_MODEL_PATH, load_scorer
 
 # page config
 st.set_page_config(
@@ -56,7 +65,7 @@ st.markdown("""
 @st.cache_resource
 def load_model():
     try:
-        model = joblib.load("models/xg_model_pipeline.pkl")
+        model = load_scorer(XG_MODEL_PATH)
         return model
     except FileNotFoundError as e:
         st.error(f"Model artifact not found: {e}")
@@ -66,6 +75,15 @@ def load_model():
         st.error(f"Error loading model: {e}")
         st.stop()
 
+
+@st.cache_resource
+def load_table():
+    # precomputed grid predictions; None when missing or built from another model
+    try:
+        return load_quote_table(model_path=XG_MODEL_PATH)
+    except Exception:
+        return None
+
         
 @st.cache_data()
 def load_dataset():
@@ -79,11 +97,13 @@ def load_dataset():
         st.error(f"Error loading dataset: {e}")
         st.stop()
 
-def predict_bill(patient_data, model):
+def predict_bill(patient_data, model, table=None):
     
     try:
-        input_df = pd.DataFrame([patient_data])
-        predicted_bill = model.predict(input_df)[0]
+        if table is not None:
+            predicted_bill = table.predict(patient_data, model)
+        else:
+            predicted_bill = model.predict_one(patient_data)
         
         return predicted_bill
     
@@ -91,46 +111,130 @@ def predict_bill(patient_data, model):
         st.error(f"Prediction error: {e}")
 
 
-def calculate_risk(age, bmi, smoker):
-    score = 0
-
-    # Age scoring
-    if age < 30:
-        score += 0
-    elif 30 <= age <= 50:
-        score += 1
-    else:
-        score += 2
-
-    # BMI scoring
-    if bmi < 25:
-        score += 0
-    elif 25 <= bmi <= 30:
-        score += 1
-    else:
-        score += 2
-
-    # Smoker scoring
-    if smoker == "Yes":
-        score += 3
-
-    # Determine risk level
-    if score <= 2:
-        risk_level = "Low"
-        risk_color = "🟢"
-    elif score <= 4:
-        risk_level = "Medium"
-        risk_color = "🟡"
-    else:
-        risk_level = "High"
-        risk_color = "🔴"
-    
-    risk = {
-            "risk_level": risk_level,
-            "risk_color": risk_color
-    }
-    
-    return risk
+# batch upload settings
+BATCH_COLUMNS = INPUT_COLUMNS
+BATCH_CHUNK_SIZE = 100_000
+
+
+def validate_batch(df):
+    # normalise headers, then split rows into valid and rejected
+    df = df.rename(columns=lambda c: str(c).strip().lower())
+    missing = [c for c in BATCH_COLUMNS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+
+    df = df[BATCH_COLUMNS].copy()
+    reasons = pd.Series("", index=df.index)
+
+    for col in ["age", "bmi", "children"]:
+        raw = df[col]
+        df[col] = pd.to_numeric(raw, errors="coerce")
+        bad = df[col].isna() & raw.notna()
+        reasons[bad] += f"{col} is not a number; "
+
+    out_of_range = (
+        ~df["age"].between(*AGE_RANGE) & df["age"].notna() |
+        ~df["bmi"].between(*BMI_RANGE) & df["bmi"].notna() |
+        ~df["children"].between(*CHILDREN_RANGE) & df["children"].notna()
+    )
+    reasons[out_of_range] += "age, bmi or children out of range; "
+
+    for col in ["gender", "state", "smoker"]:
+        df[col] = df[col].astype("string").str.strip()
+
+    reasons[df["gender"].notna() & ~df["gender"].isin(GENDER_OPTIONS)] += "unknown gender; "
+    reasons[~df["state"].isin(STATE_OPTIONS)] += "unknown state; "
+    reasons[~df["smoker"].isin(SMOKER_OPTIONS)] += "smoker must be Yes or No; "
+
+    valid = reasons == ""
+    rejected = df[~valid].assign(reason=reasons[~valid].str.rstrip("; "))
+    df = df[valid].astype({"gender": object, "state": object, "smoker": object})
+    df["gender"] = df["gender"].where(df["gender"].notna(), np.nan)
+
+    return df, rejected
+
+
+def score_batch(df, model, chunk_size=BATCH_CHUNK_SIZE, explainer=None):
+    # score in large chunks and append each scored chunk to a temporary csv,
+    # so the file is only read into memory once, as the download's bytes
+    progress = st.progress(0.0, text="Scoring applicants...")
+    band_counts = risk_counts(np.zeros(0, dtype=np.int8))
+
+    with tempfile.TemporaryFile() as scored_file:
+        for start in range(0, len(df), chunk_size):
+            chunk = df.iloc[start:start + chunk_size]
+            codes = risk_codes(chunk["age"], chunk["bmi"], chunk["smoker"])
+            scored = chunk.assign(
+                # float64 naira to the kobo, as on the single quote; float32 bills are written as 1.4186983e+07
+                predicted_bill=model.predict_many(chunk).astype(np.float64).round(2),
+                risk_level=risk_labels(codes)
+            )
+            if explainer is not None:
+                contributions = explainer.explain_many(chunk, chunk_size=chunk_size)
+                scored = scored.join(contributions.drop(columns="predicted_bill").round(2))
+            scored.to_csv(scored_file, index=False, header=(start == 0))
+            band_counts += risk_counts(codes)
+            progress.progress(min(start + chunk_size, len(df)) / len(df), text="Scoring applicants...")
+
+        progress.empty()
+        scored_file.seek(0)
+        return scored_file.read(), band_counts
+
+
+def batch_mode(model):
+    st.subheader("Upload Applicants CSV")
+    st.write(f"The file must contain the columns: `{', '.join(BATCH_COLUMNS)}`.")
+
+    uploaded_file = st.file_uploader("Applicants CSV", type=["csv"])
+    if uploaded_file is None:
+        return
+
+    try:
+        raw_df = pd.read_csv(uploaded_file, dtype=str)
+        batch_df, rejected_df = validate_batch(raw_df)
+    except ValueError as e:
+        st.error(f"Invalid file: {e}")
+        return
+    except Exception as e:
+        st.error(f"Error reading file: {e}")
+        return
+
+    st.write(f"***Rows read:*** {len(raw_df):,} | ***Valid:*** {len(batch_df):,} | ***Rejected:*** {len(rejected_df):,}")
+    if not rejected_df.empty:
+        with st.expander("⚠️ Rejected rows"):
+            st.dataframe(rejected_df.head(1000))
+            st.download_button(
+                "Download rejected rows",
+                data=rejected_df.to_csv(index=False).encode("utf-8"),
+                file_name="rejected_applicants.csv",
+                mime="text/csv"
+            )
+
+    if batch_df.empty:
+        st.warning("⚠️ No valid rows to score")
+        return
+
+    explain = st.checkbox("Include feature contributions", help="Adds how much each field moves every applicant's bill")
+    if st.button("Score Applicants", type="primary", use_container_width=True):
+        try:
+            with st.spinner("Scoring applicants..."):
+                explainer = load_explainer(XG_MODEL_PATH) if explain else None
+                scored_csv, band_counts = score_batch(batch_df, model, explainer=explainer)
+        except Exception as e:
+            st.error(f"Prediction error: {e}")
+            return
+
+        st.success(f"✅ Scored {len(batch_df):,} applicants")
+        band_cols = st.columns(len(band_counts))
+        for band_col, (band, count) in zip(band_cols, band_counts.items()):
+            band_col.metric(f"{band} risk", f"{count:,}", f"{count / len(batch_df):.1%}", delta_color="off")
+        st.download_button(
+            "Download scored file",
+            data=scored_csv,
+            file_name="scored_applicants.csv",
+            mime="text/csv",
+            use_container_width=True
+        )
 
 
 def main():
@@ -140,39 +244,47 @@ def main():
     
     # load model and dataset
     model = load_model()
+    table = load_table()
 
     df = load_dataset()
            
     st.markdown("---")
+    mode = st.radio("Prediction mode", ["Single applicant", "Batch CSV upload"], horizontal=True)
+    if mode == "Batch CSV upload":
+        batch_mode(model)
+        st.markdown("---")
+        st.caption("Medical insurance cost prediction system")
+        return
+
     st.subheader("Enter Patient Details")
     
     col1, col2 = st.columns(2)
     with col1:
         age = st.number_input(
             "Age",
-            min_value=20, 
-            max_value=85, 
+            min_value=AGE_RANGE[0], 
+            max_value=AGE_RANGE[1], 
             value=25,
             help="Patient age"
         )
         
         gender = st.selectbox(
             "Gender",
-            options=["Female", "Male", "Unknown"],
+            options=GENDER_OPTIONS,
             help="Patient's gender"
         )
         
         state = st.selectbox(
             "State",
-            options=["Lagos", "Abuja", "Rivers", "Kano", "Kaduna", "Oyo", "Enugu", "Anambra", "Edo", "Delta"],
+            options=STATE_OPTIONS,
             help="State of residence"
         )
     
     with col2:
         bmi = st.number_input(
             "BMI",
-            min_value=15.0, 
-            max_value=50.0, 
+            min_value=BMI_RANGE[0], 
+            max_value=BMI_RANGE[1], 
             value=22.0,
             step=1.0,
             help="Body Mass Index"
@@ -180,8 +292,8 @@ def main():
         
         children = st.number_input(
             "Number of Children",
-            min_value=0, 
-            max_value=10, 
+            min_value=CHILDREN_RANGE[0], 
+            max_value=CHILDREN_RANGE[1], 
             value=0,
             step=1,
             help="Number of children/dependents"
@@ -189,7 +301,7 @@ def main():
         
         smoker = st.selectbox(
             "Smoker",
-            options=["Yes", "No"],
+            options=SMOKER_OPTIONS,
             help="Whether the patient is a smoker or not"
         )
         
@@ -208,7 +320,7 @@ def main():
                 "smoker": smoker
             }
             with st.spinner("Calculating predicted bill..."):
-                result = predict_bill(patient_data, model)
+                result = predict_bill(patient_data, model, table)
                 risk = calculate_risk(age, bmi, smoker)
                 if result is not None:
 
@@ -1,11 +1,15 @@
-import numpy as np
+import os
+
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-import joblib
 import streamlit as st
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import r2_score, mean_absolute_error, mean_squared_error
+
+from src.evaluation import (
+    EVAL_DATA_PATH, SEGMENT_KEYS, XG_MODEL_PATH, compare_models, comparison_table, load_evaluation, segment_table
+)
+from src.model_store import model_paths
+from src.plots import histogram, scatter
 
 st.set_page_config(
     page_title = "Model evaluation Page",
@@ -37,35 +41,112 @@ with st.sidebar:
     st.markdown("Version: 1.0.0")
     
 
-st.title("⚖️ Model Evaluation: XGBoost Regression Metrics")
-# load dataset
-df = pd.read_csv("data/cleaned/cleaned_nigeria_medical_insurance.csv")
+@st.cache_data(max_entries=8)
+def load_evaluation_artifact(model_path, data_path, model_mtime, data_mtime):
+    # mtimes only bust this cache; the artifact itself is keyed by content hashes
+    return load_evaluation(model_path, data_path)
 
-numerical_features = ["age", "bmi", "children"]
-categorical_features = ["gender", "smoker", "state"]
 
-target_column = "hospital_bill"
+@st.cache_data(max_entries=8)
+def load_comparison(paths, data_path, mtimes):
+    # stale models are evaluated in parallel worker processes
+    return comparison_table(compare_models(list(paths), data_path))
 
-X = df[numerical_features + categorical_features]
-y = df[target_column]
 
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42
-)
+def page_navigation():
+    st.markdown("---")
+    button_col1, button_col2, button_col3 = st.columns(3, gap="medium")
+    with button_col1:
+        if st.button("🏠 Go to Home page", use_container_width=True):
+            with st.spinner("Navigating to Home page..."):
+                st.switch_page("app.py")
+    with button_col2:
+        if st.button("📊 Go to EDA Dashboard", use_container_width=True):
+            with st.spinner("Navigating back to EDA dashboard..."):
+                st.switch_page("pages/eda_dashboard.py")
+    with button_col3:
+        if st.button("🔮 Go to Predictor", use_container_width=True):
+            with st.spinner("Navigating back to predictor page..."):
+                st.switch_page("pages/medical_cost_predictor.py")
+
+    # footer
+    st.markdown("---")
+    st.caption("Medical insurance cost model evaluation")
+
+
+view = st.radio("View", ["XGBoost model", "Compare all models"], horizontal=True)
+
+if view == "Compare all models":
+    st.title("⚖️ Model Evaluation: Model Comparison")
+    st.write("Every pipeline in `models/` scored on the same 20% holdout.")
+    paths = tuple(model_paths())
+    try:
+        with st.spinner("Evaluating models..."):
+            comparison = load_comparison(paths, EVAL_DATA_PATH, tuple(os.path.getmtime(p) for p in paths + (EVAL_DATA_PATH,)))
+    except Exception as e:
+        st.error(f"Error comparing models: {e}")
+        st.stop()
+
+    st.dataframe(
+        comparison.style.format({
+            "r2": "{:.4f}", "mae": "₦{:,.0f}", "mse": "₦{:,.0f}", "rmse": "₦{:,.0f}",
+            "latency_p50_ms": "{:.3f}", "latency_p99_ms": "{:.3f}", "throughput_rows_s": "{:,.0f}"
+        }),
+        use_container_width=True
+    )
 
-# load model
-model = joblib.load("models/xg_model_pipeline.pkl")
-    
-# make predictions
-y_pred = model.predict(X_test)
- 
-# calculate metrics
-r2 = r2_score(y_test, y_pred)
-mae = mean_absolute_error(y_test, y_pred)
-mse = mean_squared_error(y_test, y_pred)
-rmse = np.sqrt(mse)
-
-def kpi_card(title, value, icon="📊", color="#2E86C1"):
+    accuracy_col, cost_col = st.columns(2)
+    with accuracy_col:
+        fig_accuracy = px.bar(
+            comparison.reset_index(),
+            x="model",
+            y=["mae", "rmse"],
+            barmode="group",
+            labels={"value": "Error (₦)", "variable": "Metric"},
+            title="Holdout error"
+        )
+        st.plotly_chart(fig_accuracy, use_container_width=True)
+    with cost_col:
+        fig_cost = px.scatter(
+            comparison.reset_index(),
+            x="latency_p50_ms",
+            y="throughput_rows_s",
+            text="model",
+            size=comparison["r2"].clip(lower=0.01).to_numpy(),
+            labels={"latency_p50_ms": "Single-quote latency p50 (ms)", "throughput_rows_s": "Batch throughput (rows/s)"},
+            title="Serving cost (marker size: R²)"
+        )
+        fig_cost.update_traces(textposition="top center")
+        st.plotly_chart(fig_cost, use_container_width=True)
+
+    page_navigation()
+    st.stop()
+
+st.title("⚖️ Model Evaluation: XGBoost Regression Metrics")
+# load precomputed evaluation
+try:
+    evaluation = load_evaluation_artifact(
+        XG_MODEL_PATH, EVAL_DATA_PATH, os.path.getmtime(XG_MODEL_PATH), os.path.getmtime(EVAL_DATA_PATH)
+    )
+except Exception as e:
+    st.error(f"Error loading model evaluation: {e}")
+    st.stop()
+
+predictions = evaluation["predictions"]
+y_test = predictions["y_true"]
+y_pred = predictions["y_pred"]
+residuals = predictions["residual"]
+
+metrics = evaluation["metrics"]
+r2 = metrics["r2"]
+mae = metrics["mae"]
+mse = metrics["mse"]
+rmse = metrics["rmse"]
+intervals = evaluation["bootstrap"]["intervals"]
+ci_label = f"{evaluation['bootstrap']['confidence']:.0%} CI"
+
+
+def kpi_card(title, value, icon="📊", color="#2E86C1", note=""):
     st.markdown(
         f"""
         <div style="
@@ -80,6 +161,7 @@ def kpi_card(title, value, icon="📊", color="#2E86C1"):
             <div style="font-size:16px; font-weight:bold; margin-top:5px;">
                 {value}
             </div>
+            <div style="font-size:13px; color:gray; margin-top:5px;">{note}</div>
         </div>
         """,
         unsafe_allow_html=True
@@ -92,36 +174,46 @@ with col1:
     kpi_card(
         "R² Score",
         f"{r2:.4f}",
-        color="#3498db"
+        color="#3498db",
+        note=f"{ci_label}: {intervals['r2'][0]:.4f} – {intervals['r2'][1]:.4f}"
     )
 
 with col2:
     kpi_card(
         "MAE",
         f"₦{mae:,.2f}",
-        color="#27ae60"
+        color="#27ae60",
+        note=f"{ci_label}: ₦{intervals['mae'][0]:,.0f} – ₦{intervals['mae'][1]:,.0f}"
         )
 
 with col3:
     kpi_card(
         "MSE",
         f"₦{mse:,.0f}",
-        color="#e74c3c"
+        color="#e74c3c",
+        note=f"{ci_label}: ₦{intervals['mse'][0]:,.0f} – ₦{intervals['mse'][1]:,.0f}"
         )
     
 with col4:
     kpi_card(
         "RMSE",
         f"₦{rmse:,.0f}",
-        color="#9b59b6"
+        color="#9b59b6",
+        note=f"{ci_label}: ₦{intervals['rmse'][0]:,.0f} – ₦{intervals['rmse'][1]:,.0f}"
         )
 
+st.caption(
+    f"Intervals from {evaluation['bootstrap']['n_resamples']:,} bootstrap resamples "
+    f"of the {evaluation['n_test']}-row holdout."
+)
+
 st.markdown("---")
 
 
 # actual vs predivted bill
+# large test sets are drawn as a binned density with a sample of points
 st.subheader("Actual vs Predicted bills")
-fig = px.scatter(
+fig = scatter(
     x=y_test,
     y=y_pred,
     labels={"x": "Actual bills(₦)", "y": "Predicted bills(₦)"},
@@ -138,12 +230,11 @@ fig.add_trace(
 st.plotly_chart(fig, use_container_width=True)
 
 st.subheader("Residual Analysis")
-residuals = y_test - y_pred
 
 col1, col2 = st.columns(2)
 # Residual Scatter plot
 with col1:
-    fig_res = px.scatter(
+    fig_res = scatter(
         x=y_pred,
         y=residuals,
         labels={"x": "Predicted", "y": "Residuals"},
@@ -154,21 +245,82 @@ with col1:
     
 # Residual Distribution
 with col2:
-    fig_hist = px.histogram(residuals, nbins=40, title="Residual Distribution")
+    fig_hist = histogram(residuals, nbins=40, title="Residual Distribution")
     st.plotly_chart(fig_hist, use_container_width=True)
 
 st.markdown("---")
 
 
+# segment error analysis, regrouped from the per-segment error sums in the artifact
+st.subheader("Segment Error Analysis")
+st.caption("Bias is the mean of predicted minus actual bill: positive segments are over-priced, negative under-priced.")
+
+segment_labels = {"state": "State", "smoker": "Smoker", "age_band": "Age band", "bmi_band": "BMI band"}
+segments = evaluation["segments"]
+
+group_col, count_col = st.columns([3, 1])
+with group_col:
+    group_by = st.multiselect(
+        "Group segments by",
+        SEGMENT_KEYS,
+        default=["state", "smoker"],
+        format_func=segment_labels.get
+    )
+with count_col:
+    min_count = st.number_input("Minimum rows per segment", min_value=1, value=1, step=1)
+
+# drill down: restrict any dimension before regrouping
+filters = {}
+filter_cols = st.columns(len(SEGMENT_KEYS))
+for filter_col, key in zip(filter_cols, SEGMENT_KEYS):
+    with filter_col:
+        options = list(segments[key].dropna().unique())
+        if hasattr(segments[key], "cat"):
+            options = [option for option in segments[key].cat.categories if option in options]
+        selected = st.multiselect(segment_labels[key], sorted(options) if key in ("state", "smoker") else options)
+        if selected:
+            filters[key] = selected
+
+segment_df = segment_table(segments, group_by, filters)
+segment_df = segment_df[segment_df["count"] >= min_count].sort_values("mae", ascending=False)
+
+if segment_df.empty:
+    st.warning("⚠️ No segments match the selected filters")
+else:
+    segment_df.index = [
+        " | ".join(str(part) for part in (label if isinstance(label, tuple) else (label,)))
+        for label in segment_df.index
+    ]
+    segment_df.index.name = " × ".join(segment_labels[key] for key in group_by) or "Segment"
+
+    fig_segments = px.bar(
+        segment_df.head(25).reset_index(),
+        x="mae",
+        y=segment_df.index.name,
+        color="bias",
+        color_continuous_scale="RdBu_r",
+        color_continuous_midpoint=0,
+        orientation="h",
+        hover_data={"count": True, "rmse": ":,.0f", "bias": ":,.0f"},
+        labels={"mae": "MAE (₦)", "bias": "Bias (₦)"},
+        title="Segments with the largest MAE (top 25)"
+    )
+    fig_segments.update_layout(yaxis={"autorange": "reversed"})
+    st.plotly_chart(fig_segments, use_container_width=True)
+    st.dataframe(
+        segment_df.style.format({"mae": "₦{:,.0f}", "rmse": "₦{:,.0f}", "bias": "₦{:,.0f}"}),
+        use_container_width=True
+    )
+
+st.markdown("---")
+
+
 st.subheader("Feature Importance - XGBoost Model")
 # st.write("Top most important features based on linear coefficients")
 
-xg_model = model.named_steps["xgregressor"]
-feature_names = model.named_steps["preprocessor"].get_feature_names_out()
-
 importance_df = pd.DataFrame({
-    "feature": feature_names,
-    "importance": xg_model.feature_importances_
+    "feature": evaluation["importances"]["features"],
+    "importance": evaluation["importances"]["values"]
 })
 
 importance_df = importance_df.sort_values("importance", ascending=True)
@@ -198,24 +350,4 @@ st.info("""
 """)
 
 # navigation
-st.markdown("---")
-button_col1, button_col2, button_col3 = st.columns(3, gap="medium")
-with button_col1:
-    if st.button("🏠 Go to Home page", use_container_width=True):
-        with st.spinner("Navigating to Home page..."):
-            st.switch_page("app.py")
-with button_col2:   
-    if st.button("📊 Go to EDA Dashboard", use_container_width=True):
-        with st.spinner("Navigating back to EDA dashboard..."):
-            st.switch_page("pages/eda_dashboard.py")
-with button_col3:
-    if st.button("🔮 Go to Predictor", use_container_width=True):
-        with st.spinner("Navigating back to predictor page..."):
-            st.switch_page("pages/medical_cost_predictor.py")
-    
-
-# footer
-st.markdown("---")
-st.caption("Medical insurance cost model evaluation")
-
-
+page_navigation()
@@ -1,5 +1,12 @@
+import plotly.express as px
+import plotly.graph_objects as go
 import streamlit as st
 
+from src.explain import load_explainer
+from src.features import INPUT_COLUMNS
+from src.scoring import XG_MODEL_PATH, load_scorer
+from src.whatif import sensitivity_curves
+
 st.set_page_config(
     page_title = "Prediction Result",
     page_icon = "📄",
@@ -29,6 +36,71 @@ with st.sidebar:
     st.markdown("Model: XGBoost Regression")
     st.markdown("Version: 1.0.0")
 
+@st.cache_resource
+def load_model():
+    try:
+        return load_scorer(XG_MODEL_PATH)
+    except Exception as e:
+        st.error(f"Error loading model: {e}")
+        st.stop()
+
+
+@st.cache_data(max_entries=256)
+def load_sensitivity_curves(applicant):
+    # one batched prediction per applicant, reused across reruns
+    return sensitivity_curves(dict(zip(INPUT_COLUMNS, applicant)), load_model())
+
+
+@st.cache_resource
+def load_quote_explainer():
+    try:
+        return load_explainer(XG_MODEL_PATH)
+    except Exception as e:
+        st.error(f"Error loading explainer: {e}")
+        st.stop()
+
+
+def contribution_chart(contributions, base_value, labels):
+    # waterfall from the average bill to this applicant's estimate
+    fields = sorted(contributions, key=lambda field: abs(contributions[field]), reverse=True)
+    fig = go.Figure(go.Waterfall(
+        orientation="h",
+        measure=["absolute"] + ["relative"] * len(fields) + ["total"],
+        y=["Average bill"] + [labels[field] for field in fields] + ["Estimated bill"],
+        x=[base_value] + [contributions[field] for field in fields] + [0],
+        increasing={"marker": {"color": "#e74c3c"}},
+        decreasing={"marker": {"color": "#2ecc71"}},
+        totals={"marker": {"color": "#3498db"}}
+    ))
+    fig.update_layout(yaxis={"autorange": "reversed"}, xaxis_title="Bill (₦)", showlegend=False)
+    return fig
+
+
+def sensitivity_chart(curves, variable, current, label):
+    curve = curves[curves["variable"] == variable]
+    if variable in ("smoker", "state"):
+        curve = curve.sort_values("predicted_bill", ascending=False)
+        fig = px.bar(
+            curve,
+            x="value",
+            y="predicted_bill",
+            labels={"value": label, "predicted_bill": "Predicted bill (₦)"},
+            color=curve["value"] == current,
+            color_discrete_map={True: "#e74c3c", False: "#3498db"}
+        )
+        fig.update_layout(showlegend=False)
+    else:
+        fig = px.line(
+            curve,
+            x="value",
+            y="predicted_bill",
+            labels={"value": label, "predicted_bill": "Predicted bill (₦)"},
+            markers=variable == "children"
+        )
+        fig.add_vline(x=current, line_dash="dash", line_color="#e74c3c", annotation_text="Applicant")
+    return fig
+
+
 st.title("📄 Prediction Result")
 if "predicted_bill" not in st.session_state:
     st.warning("No prediction found. Please make a prediction first.")
@@ -88,6 +160,38 @@ with summary_col2:
     st.write(f"***Smoker:*** {smoker}")
 
 
+# feature contributions
+st.markdown("---")
+st.subheader("🔍 What Drives This Estimate")
+st.caption("How much each detail adds to or takes off the average bill for this applicant.")
+
+applicant = {"age": age, "gender": gender, "state": state, "bmi": bmi, "children": children, "smoker": smoker}
+contributions, base_value = load_quote_explainer().explain_one(applicant)
+field_labels = {
+    "age": f"Age ({age})", "gender": f"Gender ({gender})", "state": f"State ({state})",
+    "bmi": f"BMI ({bmi:.1f})", "children": f"Children ({children})", "smoker": f"Smoker ({smoker})"
+}
+st.plotly_chart(contribution_chart(contributions, base_value, field_labels), use_container_width=True)
+
+# what-if analysis
+st.markdown("---")
+st.subheader("📈 What-if Analysis")
+st.caption("How the estimated bill moves when one detail changes and everything else stays the same.")
+
+curves = load_sensitivity_curves(tuple(applicant[column] for column in INPUT_COLUMNS))
+
+age_tab, bmi_tab, children_tab, smoker_tab, state_tab = st.tabs(["Age", "BMI", "Children", "Smoker", "State"])
+with age_tab:
+    st.plotly_chart(sensitivity_chart(curves, "age", age, "Age (years)"), use_container_width=True)
+with bmi_tab:
+    st.plotly_chart(sensitivity_chart(curves, "bmi", bmi, "BMI (kg/m²)"), use_container_width=True)
+with children_tab:
+    st.plotly_chart(sensitivity_chart(curves, "children", children, "Number of children"), use_container_width=True)
+with smoker_tab:
+    st.plotly_chart(sensitivity_chart(curves, "smoker", smoker, "Smoker"), use_container_width=True)
+with state_tab:
+    st.plotly_chart(sensitivity_chart(curves, "state", state, "State"), use_container_width=True)
+
 # recommendations
 st.markdown("---")
 st.subheader("💡 Recommendations")
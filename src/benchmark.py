@@ -0,0 +1,313 @@
+"""Reproducible benchmark of the model pipelines: accuracy and serving cost.
+
+For every pipeline in ``models/`` (LR, RF, XGBoost) the benchmark:
+
+- runs K-fold cross-validation on an unfitted clone of the shipped pipeline,
+  folds spread over a process pool (one fresh process per fold, one thread
+  per fit), recording fit time, fold metrics and peak memory;
+- profiles the shipped artifact in a fresh process: single-row and batched
+  predict latency (p50/p99), rows/sec throughput, peak memory and artifact
+  size. Every timing is repeated ``SERVING_ROUNDS`` times within a profile
+  and the fastest round's median is kept, and the profile is repeated in
+  ``SERVING_RUNS`` fresh processes keeping the best of each metric, so
+  one slow round or one slow process does not move the numbers.
+
+The JSON report records library versions and file hashes next to the
+numbers. Passing ``--baseline`` compares against an earlier report and
+exits non-zero on regressions in accuracy or serving cost. Serving metrics
+are noisier than accuracy, so they get a wider ``--serving-tolerance`` and
+changes smaller than a per-metric absolute noise floor are never flagged.
+
+Usage:
+    python -m src.benchmark [--folds 5] [--workers N] [--output cache/benchmark/report.json]
+    python -m src.benchmark --baseline old_report.json [--tolerance 0.1] [--serving-tolerance 0.5]
+"""
+import argparse
+import concurrent.futures
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.artifacts import CACHE_DIR, file_sha256, read_json, write_json
+from src.evaluation import EVAL_DATA_PATH, RANDOM_STATE, regression_metrics
+from src.features import CATEGORICAL_FEATURES, NUMERICAL_FEATURES, TARGET_COLUMN
+from src.model_store import model_name, model_paths
+
+REPORT_VERSION = 2
+BENCHMARK_DIR = os.path.join(CACHE_DIR, "benchmark")
+REPORT_PATH = os.path.join(BENCHMARK_DIR, "report.json")
+N_FOLDS = 5
+SINGLE_ROW_CALLS = 500
+BATCH_SIZE = 1024
+BATCH_CALLS = 50
+SERVING_ROUNDS = 3
+SERVING_RUNS = 3
+
+# relative change treated as a regression, for cv metrics and for serving metrics
+TOLERANCE = 0.1
+SERVING_TOLERANCE = 0.5
+
+# (report section, metric, direction, noise floor): +1 means higher is better;
+# absolute changes within the noise floor are never regressions
+REGRESSION_CHECKS = [
+    ("cv", "r2_mean", 1, 0.0),
+    ("cv", "mae_mean", -1, 0.0),
+    ("cv", "rmse_mean", -1, 0.0),
+    ("serving", "scorer_single_p50_ms", -1, 0.05),
+    ("serving", "batch_p50_ms", -1, 1.0),
+    ("serving", "throughput_rows_s", 1, 0.0),
+    ("serving", "peak_rss_mb", -1, 10.0),
+    ("serving", "artifact_bytes", -1, 0.0),
+]
+
+
+def load_dataset(data_path=EVAL_DATA_PATH):
+    df = pd.read_csv(data_path)
+    return df[NUMERICAL_FEATURES + CATEGORICAL_FEATURES], df[TARGET_COLUMN]
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+
+def _percentiles_ms(seconds):
+    p50, p99 = np.percentile(np.asarray(seconds) * 1000, [50, 99])
+    return round(float(p50), 4), round(float(p99), 4)
+
+
+def _best_round_ms(rounds):
+    # p50 and p99 of the round with the lowest median
+    return min(_percentiles_ms(seconds) for seconds in rounds)
+
+
+def run_fold(model_path, data_path, fold, n_folds, seed=RANDOM_STATE):
+    """Fit an unfitted clone of the pipeline on one CV training split; score the held-out fold."""
+    from sklearn.base import clone
+    from sklearn.model_selection import KFold
+
+    from src.scoring import load_model
+
+    X, y = load_dataset(data_path)
+    train_index, test_index = list(KFold(n_folds, shuffle=True, random_state=seed).split(X))[fold]
+
+    pipeline = clone(load_model(model_path))
+    # folds already run in parallel, so each fit gets a single thread
+    estimator_step = pipeline.steps[-1][0]
+    if "n_jobs" in pipeline.steps[-1][1].get_params():
+        pipeline.set_params(**{f"{estimator_step}__n_jobs": 1})
+
+    start = time.perf_counter()
+    pipeline.fit(X.iloc[train_index], y.iloc[train_index])
+    fit_s = time.perf_counter() - start
+
+    metrics = regression_metrics(y.iloc[test_index], pipeline.predict(X.iloc[test_index]))
+    return {"fold": fold, "fit_s": round(fit_s, 4), "peak_rss_mb": _peak_rss_mb(), **metrics}
+
+
+def profile_serving(model_path, data_path, single_calls=SINGLE_ROW_CALLS, batch_size=BATCH_SIZE, batch_calls=BATCH_CALLS,
+                    rounds_count=SERVING_ROUNDS):
+    """Latency, throughput and memory of the shipped artifact, measured in a fresh process.
+
+    Each timing runs ``rounds_count`` times; latencies come from the round with the lowest median.
+    """
+    from src.scoring import load_model, load_scorer
+
+    X, _ = load_dataset(data_path)
+    start = time.perf_counter()
+    pipeline = load_model(model_path)
+    scorer = load_scorer(model_path)
+    load_s = time.perf_counter() - start
+
+    quotes = X.to_dict("records")
+    rows = [X.iloc[[i]] for i in range(min(len(X), 100))]
+    batch = X.iloc[np.arange(batch_size) % len(X)]
+    pipeline.predict(rows[0])
+    scorer.predict_one(quotes[0])
+    scorer.predict_many(batch)
+
+    def timed(func, args_list):
+        rounds = []
+        for _ in range(rounds_count):
+            seconds = []
+            for args in args_list:
+                start = time.perf_counter()
+                func(args)
+                seconds.append(time.perf_counter() - start)
+            rounds.append(seconds)
+        return rounds
+
+    pipeline_single = timed(pipeline.predict, [rows[i % len(rows)] for i in range(min(single_calls, 200))])
+    scorer_single = timed(scorer.predict_one, [quotes[i % len(quotes)] for i in range(single_calls)])
+    batched = timed(scorer.predict_many, [batch] * batch_calls)
+
+    pipeline_p50, pipeline_p99 = _best_round_ms(pipeline_single)
+    single_p50, single_p99 = _best_round_ms(scorer_single)
+    batch_p50, batch_p99 = _best_round_ms(batched)
+    return {
+        "load_s": round(load_s, 4),
+        "pipeline_single_p50_ms": pipeline_p50,
+        "pipeline_single_p99_ms": pipeline_p99,
+        "scorer_single_p50_ms": single_p50,
+        "scorer_single_p99_ms": single_p99,
+        "batch_size": batch_size,
+        "batch_p50_ms": batch_p50,
+        "batch_p99_ms": batch_p99,
+        "rounds": rounds_count,
+        "throughput_rows_s": round(batch_size / (batch_p50 / 1000), 1),
+        "peak_rss_mb": _peak_rss_mb(),
+        "artifact_bytes": os.path.getsize(model_path),
+    }
+
+
+def best_of_runs(runs):
+    """Best value of each serving metric over repeated profiles: highest throughput, lowest everything else."""
+    best = {key: (max if key == "throughput_rows_s" else min)(run[key] for run in runs) for key in runs[0]}
+    best["runs"] = len(runs)
+    return best
+
+
+def summarize_folds(folds):
+    summary = {}
+    for name in ("fit_s", "r2", "mae", "mse", "rmse"):
+        values = np.array([fold[name] for fold in folds])
+        summary[f"{name}_mean"] = float(values.mean())
+        summary[f"{name}_std"] = float(values.std(ddof=1)) if len(values) > 1 else 0.0
+    summary["fit_peak_rss_mb"] = max(fold["peak_rss_mb"] for fold in folds)
+    return summary
+
+
+def run_benchmark(paths=None, data_path=EVAL_DATA_PATH, n_folds=N_FOLDS, max_workers=None, serving_runs=SERVING_RUNS):
+    paths = paths or model_paths()
+    # one fresh process per task, so peak RSS belongs to that fold or profile alone
+    context = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(max_workers or os.cpu_count(), mp_context=context, max_tasks_per_child=1) as pool:
+        fold_futures = {
+            path: [pool.submit(run_fold, path, data_path, fold, n_folds) for fold in range(n_folds)]
+            for path in paths
+        }
+        folds = {path: [future.result() for future in futures] for path, futures in fold_futures.items()}
+
+    # serving profiles run one at a time, so latencies are not skewed by other work;
+    # runs of the models are interleaved so a slow spell does not hit one model only
+    runs = {path: [] for path in paths}
+    for _ in range(serving_runs):
+        for path in paths:
+            with concurrent.futures.ProcessPoolExecutor(1, mp_context=context) as pool:
+                runs[path].append(pool.submit(profile_serving, path, data_path).result())
+    serving = {path: best_of_runs(runs[path]) for path in paths}
+
+    import sklearn
+    import xgboost
+
+    return {
+        "report_version": REPORT_VERSION,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "sklearn": sklearn.__version__,
+            "xgboost": xgboost.__version__,
+        },
+        "dataset": {"path": os.path.basename(data_path), "sha256": file_sha256(data_path), "n_folds": n_folds},
+        "models": {
+            model_name(path): {
+                "artifact": os.path.basename(path),
+                "sha256": file_sha256(path),
+                "cv": summarize_folds(folds[path]),
+                "folds": folds[path],
+                "serving": serving[path],
+            }
+            for path in paths
+        },
+    }
+
+
+def find_regressions(baseline, report, tolerance=TOLERANCE, serving_tolerance=SERVING_TOLERANCE):
+    """Metrics that got worse than the baseline by more than the tolerance (relative).
+
+    cv metrics use ``tolerance`` and serving metrics ``serving_tolerance``;
+    a change within the metric's noise floor in ``REGRESSION_CHECKS`` is ignored.
+    """
+    regressions = []
+    for name, model in report["models"].items():
+        if name not in baseline["models"]:
+            continue
+        for section, metric, direction, noise_floor in REGRESSION_CHECKS:
+            old = baseline["models"][name][section].get(metric)
+            new = model[section].get(metric)
+            if old is None or new is None or abs(new - old) <= noise_floor:
+                continue
+            change = (new - old) / abs(old) if old else 0.0
+            limit = serving_tolerance if section == "serving" else tolerance
+            if direction * change < -limit:
+                regressions.append({"model": name, "metric": metric, "baseline": old, "current": new,
+                                    "change": round(change, 4)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-validate and profile the model pipelines.")
+    parser.add_argument("--folds", type=int, default=N_FOLDS)
+    parser.add_argument("--workers", type=int, default=None, help="processes for the CV folds (default: all cores)")
+    parser.add_argument("--serving-runs", type=int, default=SERVING_RUNS,
+                        help="fresh-process profiles per model; the best of each metric is kept")
+    parser.add_argument("--data", default=EVAL_DATA_PATH)
+    parser.add_argument("--output", default=REPORT_PATH, help="JSON report path")
+    parser.add_argument("--baseline", default=None, help="earlier report to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="relative change in a cv metric treated as a regression")
+    parser.add_argument("--serving-tolerance", type=float, default=SERVING_TOLERANCE,
+                        help="relative change in a serving metric treated as a regression")
+    args = parser.parse_args()
+
+    report = run_benchmark(data_path=args.data, n_folds=args.folds, max_workers=args.workers,
+                           serving_runs=args.serving_runs)
+    if args.baseline:
+        report["regressions"] = find_regressions(read_json(args.baseline), report, args.tolerance,
+                                                 args.serving_tolerance)
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    write_json(args.output, report)
+
+    print("=" * 60)
+    print(f"MODEL BENCHMARK ({args.folds}-fold CV)")
+    print("=" * 60)
+    rows = {
+        name: {
+            "r2": model["cv"]["r2_mean"],
+            "rmse": model["cv"]["rmse_mean"],
+            "fit_s": model["cv"]["fit_s_mean"],
+            "single_p50_ms": model["serving"]["scorer_single_p50_ms"],
+            "single_p99_ms": model["serving"]["scorer_single_p99_ms"],
+            "batch_p50_ms": model["serving"]["batch_p50_ms"],
+            "rows_s": model["serving"]["throughput_rows_s"],
+            "peak_mb": model["serving"]["peak_rss_mb"],
+            "size_kb": model["serving"]["artifact_bytes"] / 1024,
+        }
+        for name, model in report["models"].items()
+    }
+    print(pd.DataFrame(rows).T.to_string(float_format=lambda value: f"{value:,.3f}"))
+    print(f"\nReport written to {args.output}")
+
+    if args.baseline:
+        for regression in report["regressions"]:
+            print(f"REGRESSION {regression['model']} {regression['metric']}: "
+                  f"{regression['baseline']:,.4f} -> {regression['current']:,.4f} ({regression['change']:+.1%})")
+        if report["regressions"]:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
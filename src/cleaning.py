@@ -0,0 +1,256 @@
+"""Cleaning of the raw insurance CSV, as done in notebooks/01_data_cleaning.ipynb.
+
+The notebook cleans every value with chained ``str.replace`` calls inside
+``Series.apply``. Here the raw columns are read as categoricals, so the
+parser factorizes them, and the same string operations run once per
+distinct raw spelling ("47yrs", " Lagos ", "N"), vectorized with ``.str``
+methods. The results are mapped back to the rows by their integer codes
+and text columns stay categorical. Raw feeds repeat a small set of
+spellings, so the cost of the string work grows with the number of
+distinct values, not rows.
+
+The replacements run in the notebook's order and ``int``/``float`` parsing
+keeps its rules, so ``clean_raw`` on data/raw/nigeria_medical_insurance.csv
+writes exactly data/cleaned/cleaned_nigeria_medical_insurance.csv. One
+difference: a hospital bill that does not parse is missing (and the row
+dropped) instead of raising.
+
+Raw dumps too big for memory go through ``stream_clean``: the file is read
+``chunk_rows`` rows at a time, each chunk is cleaned and filtered on its own
+(every rule is per row) and appended to a Parquet file as a row group, so
+peak memory is set by the chunk size.
+
+Usage:
+    python -m src.cleaning [--input data/raw/nigeria_medical_insurance.csv]
+                           [--output data/cleaned/cleaned_nigeria_medical_insurance.csv]
+                           [--chunk-rows 500000]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.artifacts import DATA_DIR
+
+RAW_DATA_PATH = os.path.join(DATA_DIR, "raw", "nigeria_medical_insurance.csv")
+CLEANED_DATA_PATH = os.path.join(DATA_DIR, "cleaned", "cleaned_nigeria_medical_insurance.csv")
+
+CLEAN_COLUMNS = ["age", "gender", "bmi", "children", "smoker", "state", "hospital_bill"]
+# rows without these are dropped: the target and the fields that cannot be imputed
+CRITICAL_COLUMNS = ["smoker", "state", "hospital_bill"]
+MAX_BMI = 45
+MAX_HOSPITAL_BILL = 38_000_000
+CHUNK_ROWS = 500_000
+
+# one schema for every row group of a streamed file, whatever values a chunk holds
+PARQUET_SCHEMA = pa.schema([
+    ("age", pa.int64()),
+    ("gender", pa.dictionary(pa.int32(), pa.string())),
+    ("bmi", pa.float64()),
+    ("children", pa.int64()),
+    ("smoker", pa.dictionary(pa.int32(), pa.string())),
+    ("state", pa.dictionary(pa.int32(), pa.string())),
+    ("hospital_bill", pa.float64()),
+])
+
+# literal replacements, applied in order like the notebook's chained str.replace
+AGE_REPLACEMENTS = [("yrs", ""), ("age_", ""), (",", ""), (".0", "")]
+BMI_REPLACEMENTS = [("kg/m2", ""), (" ", ""), (",", ""), ("unknown", "nan")]
+CHILDREN_REPLACEMENTS = [("three", "3"), (",", ""), (".0", ""), ("none", "0")]
+BILL_REPLACEMENTS = [("₦", ""), ("NGN", ""), (",", ""), ("none", "0")]
+
+GENDER_MAP = {"F": "Female", "M": "Male", "fem": "female", "male": "Male", "unknown": np.nan}
+SMOKER_MAP = {"N": "No", "Y": "Yes", "?": np.nan, "Non-smoker": "No", "Smoker": "Yes"}
+STATE_MAP = {"?": np.nan}
+
+
+def normalize_header(name):
+    # "Age " -> "age", " Gender" -> "gender", "Smoker?" -> "smoker"
+    return name.strip().lower().rstrip("?").strip()
+
+
+def _replace(text, replacements):
+    for old, new in replacements:
+        text = text.str.replace(old, new, regex=False)
+    return text
+
+
+def _drop_digit_separators(text):
+    # int() and float() accept single underscores between digits ("1_000")
+    return text.str.replace(r"(?<=\d)_(?=\d)", "", regex=True)
+
+
+def _integers(text):
+    # int() rules: an optional sign and digits, anything else is missing
+    valid = text.str.fullmatch(r"[+-]?\d+(?:_\d+)*").fillna(False).astype(bool)
+    return pd.to_numeric(_drop_digit_separators(text.where(valid)), errors="coerce").astype("Int64")
+
+
+def _floats(text):
+    return pd.to_numeric(_drop_digit_separators(text), errors="coerce").astype(np.float64)
+
+
+def clean_age(text):
+    return _integers(_replace(text, AGE_REPLACEMENTS).str.strip())
+
+
+def clean_gender(text):
+    return text.replace(GENDER_MAP).str.strip().str.capitalize()
+
+
+def clean_bmi(text):
+    return _floats(_replace(text, BMI_REPLACEMENTS).str.strip())
+
+
+def clean_children(text):
+    return _integers(_replace(text, CHILDREN_REPLACEMENTS).str.strip())
+
+
+def clean_smoker(text):
+    return text.str.capitalize().replace(SMOKER_MAP).str.strip()
+
+
+def clean_state(text):
+    return text.replace(STATE_MAP).str.strip().str.capitalize()
+
+
+def clean_bill(text):
+    return _floats(_replace(text, BILL_REPLACEMENTS).str.strip())
+
+
+# column -> (cleaner over distinct raw strings, whether the result is categorical)
+CLEANERS = {
+    "age": (clean_age, False),
+    "gender": (clean_gender, True),
+    "bmi": (clean_bmi, False),
+    "children": (clean_children, False),
+    "smoker": (clean_smoker, True),
+    "state": (clean_state, True),
+    "hospital_bill": (clean_bill, False),
+}
+
+
+def clean_column(values, clean, categorical=False):
+    """``clean`` applied once per distinct value of ``values`` and mapped back to every row."""
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # already factorized, e.g. by read_raw
+        codes, uniques = values.cat.codes.to_numpy(), values.cat.categories
+    else:
+        codes, uniques = pd.factorize(values)
+    cleaned = clean(pd.Series(uniques, dtype=object))
+    if categorical:
+        # several raw spellings collapse onto one category: remap the codes
+        clean_codes, categories = pd.factorize(cleaned, sort=True)
+        return pd.Categorical.from_codes(np.where(codes >= 0, clean_codes[codes], -1), categories)
+    return cleaned.array.take(codes, allow_fill=True)
+
+
+def read_raw(path=RAW_DATA_PATH, **kwargs):
+    # every column as a categorical of raw strings: the parser does the factorizing,
+    # and a chunk that happens to look numeric is cleaned the same way
+    return pd.read_csv(path, dtype="category", **kwargs)
+
+
+def clean_frame(raw):
+    """Cleaned columns of a raw frame, before any rows are dropped."""
+    raw = raw.rename(columns=normalize_header)
+    missing = [column for column in CLEAN_COLUMNS if column not in raw]
+    if missing:
+        raise ValueError(f"Raw data has no column for: {', '.join(missing)}")
+    return pd.DataFrame({
+        column: clean_column(raw[column], *CLEANERS[column]) for column in CLEAN_COLUMNS
+    }, index=raw.index)
+
+
+def drop_invalid(df):
+    """Rows the notebook keeps: no missing critical column, bmi and hospital_bill within the caps."""
+    df = df.dropna(subset=CRITICAL_COLUMNS)
+    return df[(df["bmi"] <= MAX_BMI) & (df["hospital_bill"] <= MAX_HOSPITAL_BILL)]
+
+
+def clean_raw(raw):
+    return drop_invalid(clean_frame(raw))
+
+
+def parquet_schema():
+    # PARQUET_SCHEMA plus the pandas metadata of a cleaned frame, so reading
+    # the file back restores the nullable integer columns
+    empty = clean_frame(pd.DataFrame({column: pd.Series(dtype=object) for column in CLEAN_COLUMNS}))
+    return PARQUET_SCHEMA.with_metadata(pa.Table.from_pandas(empty, preserve_index=False).schema.metadata)
+
+
+def to_arrow(df, schema=PARQUET_SCHEMA):
+    return pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+
+def row_hashes(df):
+    """One uint64 per row from its cleaned values; equal rows hash equal, like ``duplicated``."""
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+
+def stream_clean(input_path, output_path, chunk_rows=CHUNK_ROWS, hash_rows=False):
+    """Clean ``input_path`` chunk by chunk into the Parquet file ``output_path``.
+
+    Returns rows read and kept, plus the kept rows' ``row_hashes`` in file
+    order with ``hash_rows``. The file is written next to the output and
+    moved into place at the end, so a failed run leaves no partial output.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    tmp_path = f"{output_path}.tmp"
+    schema = parquet_schema()
+    rows_read = rows_kept = 0
+    hashes = []
+    with pq.ParquetWriter(tmp_path, schema) as writer:
+        for raw in read_raw(input_path, chunksize=chunk_rows):
+            df = clean_raw(raw)
+            rows_read += len(raw)
+            rows_kept += len(df)
+            if len(df):
+                writer.write_table(to_arrow(df, schema))
+                if hash_rows:
+                    hashes.append(row_hashes(df))
+    os.replace(tmp_path, output_path)
+    result = {"rows_read": rows_read, "rows_kept": rows_kept}
+    if hash_rows:
+        result["row_hashes"] = np.concatenate(hashes) if hashes else np.zeros(0, dtype=np.uint64)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clean a raw medical insurance CSV.")
+    parser.add_argument("--input", default=RAW_DATA_PATH)
+    parser.add_argument("--output", default=None,
+                        help="cleaned CSV, or Parquet file with --chunk-rows")
+    parser.add_argument("--chunk-rows", type=int, default=None,
+                        help="stream the input in chunks of this many rows into a Parquet file")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.chunk_rows:
+        output = args.output or os.path.splitext(CLEANED_DATA_PATH)[0] + ".parquet"
+        counts = stream_clean(args.input, output, args.chunk_rows)
+        rows_read, rows_kept = counts["rows_read"], counts["rows_kept"]
+    else:
+        output = args.output or CLEANED_DATA_PATH
+        raw = read_raw(args.input)
+        df = clean_raw(raw)
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        df.to_csv(output, index=False)
+        rows_read, rows_kept = len(raw), len(df)
+    elapsed = time.perf_counter() - start
+
+    print("=" * 60)
+    print(f"Cleaned {args.input}")
+    print("=" * 60)
+    print(f"rows read:    {rows_read:,}")
+    print(f"rows dropped: {rows_read - rows_kept:,}")
+    print(f"rows kept:    {rows_kept:,} -> {output}")
+    print(f"time:         {elapsed:.2f}s ({rows_read / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""Columnar, dtype-optimized copy of the cleaned dataset for the EDA dashboard.
+
+``build_columnar`` converts the cleaned CSV once into an uncompressed Arrow
+IPC file with compact dtypes: ``gender``, ``smoker`` and ``state`` become
+dictionary-encoded categoricals, age and children the smallest integer type
+that holds them. bmi stays float64 so the stats and the preview show the
+values of the CSV. ``load_columnar`` memory-maps that file, so
+numeric columns are read without parsing or copying and the pages are shared
+by every process reading the same file.
+
+The conversion never holds the CSV in memory: ``build_columnar`` reads it
+twice with ``pyarrow.csv.open_csv`` in blocks of ``BLOCK_BYTES``. The first
+pass collects the distinct text values and the range and gaps of the
+integer columns, which fix the schema; the second converts every block to
+that schema and appends it to the IPC file. The result has the dtypes
+``optimize_dtypes`` gives the whole file in pandas.
+
+Usage:
+    python -m src.columnar [--csv data/cleaned/cleaned_nigeria_medical_insurance_1.csv] [--force]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+
+from src.artifacts import CACHE_DIR, DATA_DIR, file_sha256, read_json, write_json
+
+FORMAT_VERSION = 3
+COLUMNAR_DIR = os.path.join(CACHE_DIR, "columnar")
+EDA_DATA_PATH = os.path.join(DATA_DIR, "cleaned", "cleaned_nigeria_medical_insurance_1.csv")
+DATA_FILE = "data.arrow"
+META_FILE = "meta.json"
+
+CATEGORY_COLUMNS = ["gender", "smoker", "state"]
+INTEGER_COLUMNS = ["age", "children"]
+FLOAT_COLUMNS = ["bmi"]
+BLOCK_BYTES = 4 * 2**20
+
+
+def optimize_dtypes(df):
+    """Categoricals for the text columns, downcast integers; bmi and hospital_bill stay float64."""
+    df = df.copy()
+    for column in CATEGORY_COLUMNS:
+        if column in df:
+            df[column] = df[column].astype("category")
+    for column in INTEGER_COLUMNS:
+        if column in df:
+            values = pd.to_numeric(df[column])
+            # columns with missing values cannot be integers, keep them as float32
+            df[column] = values.astype(np.float32) if values.isna().any() else pd.to_numeric(values, downcast="integer")
+    for column in FLOAT_COLUMNS:
+        if column in df:
+            df[column] = pd.to_numeric(df[column]).astype(np.float64)
+    return df
+
+
+def columnar_dir_for(csv_path, columnar_dir=COLUMNAR_DIR):
+    return os.path.join(columnar_dir, os.path.splitext(os.path.basename(csv_path))[0])
+
+
+def _open_csv(csv_path, block_bytes):
+    # numbers as float64 whatever the first block looks like; integrality is checked in the scan
+    column_types = {column: pa.float64() for column in INTEGER_COLUMNS + FLOAT_COLUMNS}
+    column_types.update({column: pa.string() for column in CATEGORY_COLUMNS})
+    return pacsv.open_csv(
+        csv_path,
+        read_options=pacsv.ReadOptions(block_size=block_bytes),
+        # empty fields and "NA"/"nan" are missing in text columns too, as in read_csv
+        convert_options=pacsv.ConvertOptions(column_types=column_types, strings_can_be_null=True),
+    )
+
+
+def _integer_type(low, high):
+    # the smallest signed integer type holding [low, high], as pandas' downcast picks
+    for dtype in (np.int8, np.int16, np.int32):
+        if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+            return pa.from_numpy_dtype(dtype)
+    return pa.int64()
+
+
+def scan_schema(csv_path, block_bytes=BLOCK_BYTES):
+    """Arrow schema of the columnar store for ``csv_path``, from one streaming pass.
+
+    Returns the schema, the sorted dictionary of each text column, the row
+    count and the in-memory size of the CSV as parsed.
+    """
+    categories = {column: set() for column in CATEGORY_COLUMNS}
+    integers = {column: {"min": np.inf, "max": -np.inf, "missing": False, "whole": True} for column in INTEGER_COLUMNS}
+    rows = csv_bytes = 0
+    reader = _open_csv(csv_path, block_bytes)
+    for batch in reader:
+        rows += batch.num_rows
+        csv_bytes += batch.nbytes
+        for column in categories:
+            if column in batch.schema.names:
+                categories[column].update(pc.unique(batch[column]).drop_null().to_pylist())
+        for column, stats in integers.items():
+            if column not in batch.schema.names:
+                continue
+            values = batch[column]
+            stats["missing"] |= values.null_count > 0
+            if values.null_count < len(values):
+                bounds = pc.min_max(values)
+                stats["min"] = min(stats["min"], bounds["min"].as_py())
+                stats["max"] = max(stats["max"], bounds["max"].as_py())
+                stats["whole"] &= pc.all(pc.equal(values, pc.floor(values))).as_py()
+
+    fields = []
+    for field in reader.schema:
+        column = field.name
+        if column in categories:
+            # sorted like the categories of pandas' astype("category")
+            fields.append(pa.field(column, pa.dictionary(pa.int32(), pa.string())))
+        elif column in integers:
+            stats = integers[column]
+            # columns with missing values cannot be integers, keep them as float32
+            if stats["missing"] or not stats["whole"] or stats["min"] > stats["max"]:
+                fields.append(pa.field(column, pa.float32()))
+            else:
+                fields.append(pa.field(column, _integer_type(stats["min"], stats["max"])))
+        elif column in FLOAT_COLUMNS:
+            fields.append(pa.field(column, pa.float64()))
+        else:
+            fields.append(field)
+    dictionaries = {column: pa.array(sorted(values), pa.string()) for column, values in categories.items()}
+    return pa.schema(fields), dictionaries, rows, csv_bytes
+
+
+def _convert(batch, schema, dictionaries):
+    columns = []
+    for field in schema:
+        values = batch[field.name]
+        if field.name in dictionaries:
+            dictionary = dictionaries[field.name]
+            indices = pc.index_in(values, value_set=dictionary).cast(pa.int32())
+            columns.append(pa.DictionaryArray.from_arrays(indices, dictionary))
+        else:
+            columns.append(values.cast(field.type))
+    return pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def build_columnar(csv_path=EDA_DATA_PATH, output_dir=None, block_bytes=BLOCK_BYTES):
+    output_dir = output_dir or columnar_dir_for(csv_path)
+    os.makedirs(output_dir, exist_ok=True)
+
+    schema, dictionaries, rows, csv_bytes = scan_schema(csv_path, block_bytes)
+    data_path = os.path.join(output_dir, DATA_FILE)
+    tmp_path = f"{data_path}.tmp"
+    memory_bytes = 0
+    # uncompressed IPC so the file can be memory-mapped as-is; every batch
+    # shares the scanned dictionaries, so the file holds them once
+    with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, schema) as writer:
+        for batch in _open_csv(csv_path, block_bytes):
+            batch = _convert(batch, schema, dictionaries)
+            memory_bytes += batch.nbytes
+            writer.write_batch(batch)
+    os.replace(tmp_path, data_path)
+
+    write_json(os.path.join(output_dir, META_FILE), {
+        "format_version": FORMAT_VERSION,
+        "source": os.path.basename(csv_path),
+        "source_sha256": file_sha256(csv_path),
+        "rows": rows,
+        "dtypes": {field.name: str(field.type) for field in schema},
+        "csv_memory_bytes": int(csv_bytes),
+        "memory_bytes": int(memory_bytes),
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    })
+    return output_dir
+
+
+def is_stale(csv_path=EDA_DATA_PATH, output_dir=None):
+    meta_path = os.path.join(output_dir or columnar_dir_for(csv_path), META_FILE)
+    if not os.path.exists(meta_path):
+        return True
+    meta = read_json(meta_path)
+    return meta.get("format_version") != FORMAT_VERSION or meta.get("source_sha256") != file_sha256(csv_path)
+
+
+def load_table(csv_path=EDA_DATA_PATH, output_dir=None):
+    """Memory-mapped Arrow table, converting the CSV first if needed."""
+    output_dir = output_dir or columnar_dir_for(csv_path)
+    if is_stale(csv_path, output_dir):
+        build_columnar(csv_path, output_dir)
+    source = pa.memory_map(os.path.join(output_dir, DATA_FILE), "r")
+    return pa.ipc.open_file(source).read_all()
+
+
+def load_columnar(csv_path=EDA_DATA_PATH, output_dir=None):
+    """The dataset as a DataFrame; numeric columns without nulls stay zero-copy views of the map."""
+    return load_table(csv_path, output_dir).to_pandas(split_blocks=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a cleaned CSV into the columnar EDA store.")
+    parser.add_argument("--csv", default=EDA_DATA_PATH)
+    parser.add_argument("--force", action="store_true")
+    args = parser.parse_args()
+
+    output_dir = columnar_dir_for(args.csv)
+    if args.force or is_stale(args.csv, output_dir):
+        build_columnar(args.csv, output_dir)
+    meta = read_json(os.path.join(output_dir, META_FILE))
+    print(f"{meta['rows']:,} rows -> {output_dir}")
+    print(f"in-memory size: {meta['csv_memory_bytes'] / 2**20:.2f} MB as CSV dtypes, "
+          f"{meta['memory_bytes'] / 2**20:.2f} MB columnar")
+    for column, dtype in meta["dtypes"].items():
+        print(f"  {column:<15}{dtype}")
+
+
+if __name__ == "__main__":
+    main()
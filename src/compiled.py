@@ -0,0 +1,156 @@
+"""Compiled model artifacts: flat NumPy arrays instead of a pickled pipeline.
+
+``export_model`` walks a fitted pipeline once and writes the preprocessing
+spec plus the model parameters to a directory of ``.npy`` files: the tree
+node arrays (feature, threshold, left, right, value, default_left, roots)
+for XGBoost and random forests, or the coefficients for linear models.
+Exporting is the only step that needs joblib, sklearn and xgboost.
+
+``load_compiled`` reads the artifact back with NumPy alone, memory-mapped by
+default, so workers start without unpickling anything, share the array pages
+and do not depend on the library versions the model was trained with. When
+the source pickle is present it is hashed and compared with the
+``source_sha256`` recorded at export, and a stale artifact is refused.
+
+Usage:
+    python -m src.compiled [--model models/xg_model_pipeline.pkl] [--output cache/compiled/xg_model_pipeline]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from src.artifacts import CACHE_DIR, MODELS_DIR, file_sha256, read_json, write_json
+from src.features import FeatureEncoder
+from src.trees import ARRAY_FIELDS, TreeEnsemble
+
+FORMAT_VERSION = 2
+COMPILED_DIR = os.path.join(CACHE_DIR, "compiled")
+META_FILE = "meta.json"
+XG_MODEL_PATH = os.path.join(MODELS_DIR, "xg_model_pipeline.pkl")
+LINEAR_FIELDS = ("coef",)
+
+
+class LinearModel:
+    """prediction = X @ coef + intercept"""
+
+    def __init__(self, coef, intercept):
+        self.coef = np.asarray(coef)
+        self.intercept = float(intercept)
+
+    def arrays(self):
+        return {"coef": self.coef}
+
+    def params(self):
+        return {"intercept": self.intercept}
+
+    def predict(self, X):
+        return np.asarray(X, dtype=np.float64) @ self.coef + self.intercept
+
+    def predict_row(self, x):
+        return float(np.dot(x, self.coef) + self.intercept)
+
+
+def compiled_dir_for(model_path):
+    return os.path.join(COMPILED_DIR, os.path.splitext(os.path.basename(model_path))[0])
+
+
+def export_model(model_path=XG_MODEL_PATH, output_dir=None):
+    # heavy imports stay here so loading a compiled model never pulls them in
+    from src.scoring import load_scorer
+
+    scorer = load_scorer(model_path)
+    if scorer.trees is not None:
+        kind, predictor = "tree_ensemble", scorer.trees
+    elif hasattr(scorer.estimator, "coef_") and np.ndim(scorer.estimator.coef_) == 1:
+        kind, predictor = "linear", LinearModel(scorer.estimator.coef_, scorer.estimator.intercept_)
+    else:
+        raise ValueError(f"Cannot compile {type(scorer.estimator).__name__} from {os.path.basename(model_path)}")
+
+    output_dir = output_dir or compiled_dir_for(model_path)
+    os.makedirs(output_dir, exist_ok=True)
+    for name, array in predictor.arrays().items():
+        np.save(os.path.join(output_dir, f"{name}.npy"), np.ascontiguousarray(array))
+
+    write_json(os.path.join(output_dir, META_FILE), {
+        "format_version": FORMAT_VERSION,
+        "kind": kind,
+        "estimator": type(scorer.estimator).__name__,
+        "source": os.path.basename(model_path),
+        "source_sha256": file_sha256(model_path),
+        "feature_spec": scorer.encoder.spec,
+        "params": predictor.params(),
+        "exported_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    })
+
+    return output_dir
+
+
+class CompiledModel:
+    """Same interface as ``QuoteScorer`` (predict_one / predict_many), NumPy only."""
+
+    def __init__(self, meta, predictor):
+        self.meta = meta
+        self.predictor = predictor
+        self.encoder = FeatureEncoder(meta["feature_spec"])
+        self.feature_names = self.encoder.feature_names
+        self._row = np.zeros(self.encoder.n_features, dtype=np.float64)
+
+    def encode(self, data):
+        return self.encoder.encode_columns(data)
+
+    def predict_features(self, X):
+        return self.predictor.predict(X)
+
+    def predict_one(self, patient_data):
+        self.encoder.encode_row(patient_data, self._row)
+        return float(self.predictor.predict_row(self._row))
+
+    def predict_many(self, data):
+        return self.predictor.predict(self.encode(data))
+
+
+def is_stale(model_dir, model_path=None):
+    """Whether the pickle ``model_dir`` was compiled from has changed since.
+
+    ``model_path`` defaults to the source file name in ``models/``; an
+    artifact whose pickle is not there (e.g. deployed without it) is not stale.
+    """
+    meta = read_json(os.path.join(model_dir, META_FILE))
+    model_path = model_path or os.path.join(MODELS_DIR, meta["source"])
+    return os.path.exists(model_path) and meta.get("source_sha256") != file_sha256(model_path)
+
+
+def load_compiled(model_dir=None, mmap=True, model_path=None):
+    model_dir = model_dir or compiled_dir_for(XG_MODEL_PATH)
+    meta = read_json(os.path.join(model_dir, META_FILE))
+    if meta.get("format_version") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported compiled model format: {meta.get('format_version')}")
+    # refuse arrays compiled from an older version of the pickle
+    model_path = model_path or os.path.join(MODELS_DIR, meta["source"])
+    if is_stale(model_dir, model_path):
+        raise ValueError(f"Compiled model in {model_dir} is stale: {meta['source']} has changed since it was "
+                         f"exported, run: python -m src.compiled --model {model_path} --output {model_dir}")
+
+    kinds = {"tree_ensemble": (TreeEnsemble, ARRAY_FIELDS), "linear": (LinearModel, LINEAR_FIELDS)}
+    predictor_type, fields = kinds[meta["kind"]]
+    arrays = {
+        name: np.load(os.path.join(model_dir, f"{name}.npy"), mmap_mode="r" if mmap else None)
+        for name in fields
+    }
+    return CompiledModel(meta, predictor_type(**arrays, **meta["params"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile a model pipeline into NumPy arrays.")
+    parser.add_argument("--model", default=XG_MODEL_PATH, help="model pipeline pickle")
+    parser.add_argument("--output", default=None, help="output directory (default: cache/compiled/<model name>)")
+    args = parser.parse_args()
+
+    output_dir = export_model(args.model, args.output)
+    print(f"Compiled {os.path.basename(args.model)} to {output_dir}")
+
+
+if __name__ == "__main__":
+    main()
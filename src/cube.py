@@ -0,0 +1,443 @@
+"""Pre-aggregated data cube behind the EDA dashboard KPIs and grouped charts.
+
+Rows are grouped once into cells at (age, smoker, state, BMI bin)
+granularity, the dimensions the dashboard filters on. Each cell keeps the
+row count and, for age, bmi, children and hospital_bill, the number of
+rows where the measure is present, its sum, sum of squares and sums of
+cross-products with the other measures. Missing measures add nothing to
+the sums, and means divide by the present count.
+For every pair of measures the cell also keeps the count, sums and sums of
+squares over the rows where both are present, so correlations are
+pairwise-complete like ``DataFrame.corr``. Squares and cross-products are
+taken about a fixed per-measure ``shift`` (the mean of the data the cube
+was built from) so they stay accurate for large values like bills.
+
+Every dashboard filter is a condition on cell coordinates, so KPIs and
+grouped means, variances and the correlation matrix are sums over the
+matching cells and cost depends on the number of cells, not rows; the
+correlation's moment matrices are built from the selection's sums per
+query. BMI is rounded to ``BMI_BIN`` (the data has one decimal), so BMI
+ranges in steps of ``BMI_BIN`` are answered exactly. Missing dimension
+values are kept as their own cells: ``values`` lists them as ``None`` and
+selecting ``None`` keeps them. Rows without a BMI (or bill) get the
+``MISSING_BIN`` bin, which no BMI range (or histogram) matches.
+
+Next to the cells the cube keeps counts of hospital_bill in fixed
+``BILL_BIN_WIDTH`` bins per (age, smoker, state, ``BILL_HIST_BMI_BIN`` BMI
+band), so the bill histogram for any filter is a sum of cached bin counts.
+The bands are coarser than the cells' BMI bins to keep that table small, so
+the histogram applies a BMI range widened to whole bands. The age histogram
+is the cube's count per age.
+
+Cubes built with the same shift merge by adding cells, so ``stream_cube``
+builds one ``chunk_rows`` rows at a time from the memory-mapped columnar
+store (converted out-of-core by ``src.columnar``), merging each chunk's
+cube into a running total. Memory then depends on the chunk size and the
+number of cells, not on the file; ``build_cube`` streams any CSV larger
+than ``STREAM_THRESHOLD_BYTES``, and ``--check`` compares a streamed cube
+with the in-memory one.
+
+Usage:
+    python -m src.cube [--csv data/cleaned/cleaned_nigeria_medical_insurance_1.csv] [--force]
+                       [--chunk-rows 200000] [--check]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+from src.artifacts import CACHE_DIR, file_sha256, read_json, write_json
+from src.columnar import CATEGORY_COLUMNS, EDA_DATA_PATH, load_columnar, load_table
+from src.filters import is_missing
+
+CUBE_VERSION = 7
+CUBE_DIR = os.path.join(CACHE_DIR, "cube")
+CELLS_FILE = "cells.arrow"
+BILL_HIST_FILE = "bill_hist.arrow"
+META_FILE = "meta.json"
+
+DIMENSIONS = ["age", "smoker", "state", "bmi_bin"]
+MEASURES = ["age", "bmi", "children", "hospital_bill"]
+# the bill histogram is only ever filtered by the sidebar dimensions, with bmi in whole bands
+BILL_HIST_KEYS = ["age", "smoker", "state", "bmi_band", "bill_bin"]
+BMI_BIN = 0.1
+BILL_HIST_BMI_BIN = 1.0
+BILL_BIN_WIDTH = 1_000_000
+MISSING_BIN = np.iinfo(np.int32).min
+CHUNK_ROWS = 200_000
+MERGE_EVERY = 4
+STREAM_THRESHOLD_BYTES = 256 * 2**20
+MEASURE_PAIRS = [(a, b) for i, a in enumerate(MEASURES) for b in MEASURES[i + 1:]]
+
+
+def _bins(values, to_bin):
+    # integer bin ids, MISSING_BIN for missing values
+    values = np.asarray(values, dtype=np.float64)
+    missing = np.isnan(values)
+    bins = to_bin(np.where(missing, 0.0, values))
+    return np.where(missing, MISSING_BIN, bins).astype(np.int32)
+
+
+def bmi_bins(bmi):
+    # bmi rounded to the nearest BMI_BIN, so 45.3 lands in bin 453
+    # although 45.3 / 0.1 is 452.99999...
+    return _bins(bmi, lambda values: np.rint(values / BMI_BIN))
+
+
+def bmi_bands(bmi):
+    return _bins(bmi, lambda values: np.floor(values / BILL_HIST_BMI_BIN))
+
+
+def bill_bins(bill):
+    return _bins(bill, lambda values: np.floor(values / BILL_BIN_WIDTH))
+
+
+def _shift(df):
+    # per-measure mean; 0 for a measure with no values at all
+    means = {measure: float(df[measure].mean()) for measure in MEASURES}
+    return {measure: 0.0 if np.isnan(mean) else mean for measure, mean in means.items()}
+
+
+def cell_frame(df, shift):
+    """Per-row cube coordinates and measures, ready to be grouped."""
+    frame = pd.DataFrame({
+        "age": df["age"].to_numpy(),
+        "smoker": df["smoker"],
+        "state": df["state"],
+        "bmi_bin": bmi_bins(df["bmi"]),
+        "bmi_band": bmi_bands(df["bmi"]),
+        "bill_bin": bill_bins(df["hospital_bill"]),
+        "count": np.ones(len(df), dtype=np.int64),
+    }, index=df.index)
+    centered = {}
+    present = {}
+    for measure in MEASURES:
+        values = df[measure].to_numpy(dtype=np.float64)
+        present[measure] = ~np.isnan(values)
+        # a missing value counts for nothing: zero sum, zero deviation
+        centered[measure] = np.where(present[measure], values - shift[measure], 0.0)
+        frame[f"n_{measure}"] = present[measure].astype(np.int64)
+        frame[f"sum_{measure}"] = np.where(present[measure], values, 0.0)
+        frame[f"sumsq_{measure}"] = centered[measure] ** 2
+    # pairwise-complete statistics: <stat>_<x>__<y> is over the rows where y is present too
+    for a, b in MEASURE_PAIRS:
+        frame[f"n_{a}__{b}"] = (present[a] & present[b]).astype(np.int64)
+        for x, y in ((a, b), (b, a)):
+            frame[f"sum_{x}__{y}"] = np.where(present[y], frame[f"sum_{x}"], 0.0)
+            frame[f"sumsq_{x}__{y}"] = np.where(present[y], frame[f"sumsq_{x}"], 0.0)
+        frame[f"cross_{a}__{b}"] = centered[a] * centered[b]
+    return frame
+
+
+def _aggregate(frame, keys=DIMENSIONS):
+    return frame.groupby(keys, observed=True, sort=True, dropna=False).sum().reset_index()
+
+
+def _concat(frames):
+    # stack cell tables; categorical dimensions get the sorted union of their
+    # categories so the result stays categorical when chunks saw different values
+    frames = list(frames)
+    for column in CATEGORY_COLUMNS:
+        if all(column in f and isinstance(f[column].dtype, pd.CategoricalDtype) for f in frames):
+            categories = sorted(set().union(*(f[column].cat.categories for f in frames)))
+            frames = [f.assign(**{column: f[column].cat.set_categories(categories)}) for f in frames]
+    return pd.concat(frames, ignore_index=True)
+
+
+def _mask(frame, values=None, ranges=None, bmi_column="bmi_bin", to_bin=bmi_bins):
+    # boolean mask over cube rows (cells or histogram entries) for the dashboard filters
+    mask = np.ones(len(frame), dtype=bool)
+    for dimension, selected in (values or {}).items():
+        selected = list(selected)
+        present = [value for value in selected if not is_missing(value)]
+        column = frame[dimension]
+        selection = column.isin(present).to_numpy()
+        if len(present) < len(selected):
+            selection |= column.isna().to_numpy()
+        mask &= selection
+    for column, (low, high) in (ranges or {}).items():
+        if column != "bmi":
+            raise ValueError(f"No range index for {column}")
+        bins = frame[bmi_column].to_numpy()
+        mask &= (bins >= to_bin([low])[0]) & (bins <= to_bin([high])[0])
+    return mask
+
+
+class DataCube:
+    """Cells as columns of arrays: coordinates in ``DIMENSIONS`` plus the measures.
+
+    ``bill_hist`` has one row per (``BILL_HIST_KEYS``) with the number of rows.
+    """
+
+    def __init__(self, cells, bill_hist, shift):
+        self.cells = cells.reset_index(drop=True)
+        self.bill_hist = bill_hist.reset_index(drop=True)
+        self.shift = {measure: float(value) for measure, value in shift.items()}
+        self.n_cells = len(self.cells)
+        self.n_rows = int(self.cells["count"].sum())
+        self.shift_vector = np.array([self.shift[measure] for measure in MEASURES])
+
+    @staticmethod
+    def _moments(totals):
+        # (measures x measures) arrays from the summed cell columns; entry [i, j] is
+        # over the rows where measures i and j are both present, the diagonal over i alone
+        k = len(MEASURES)
+        counts, sums, squares, products = (np.empty((k, k)) for _ in range(4))
+        for i, measure in enumerate(MEASURES):
+            counts[i, i] = totals[f"n_{measure}"]
+            sums[i, i] = totals[f"sum_{measure}"]
+            squares[i, i] = products[i, i] = totals[f"sumsq_{measure}"]
+        for a, b in MEASURE_PAIRS:
+            i, j = MEASURES.index(a), MEASURES.index(b)
+            counts[i, j] = counts[j, i] = totals[f"n_{a}__{b}"]
+            products[i, j] = products[j, i] = totals[f"cross_{a}__{b}"]
+            sums[i, j] = totals[f"sum_{a}__{b}"]
+            sums[j, i] = totals[f"sum_{b}__{a}"]
+            squares[i, j] = totals[f"sumsq_{a}__{b}"]
+            squares[j, i] = totals[f"sumsq_{b}__{a}"]
+        return counts, sums, squares, products
+
+    @classmethod
+    def from_frame(cls, df, shift=None):
+        shift = shift or _shift(df)
+        frame = cell_frame(df, shift)
+        bill_hist = _aggregate(frame[BILL_HIST_KEYS + ["count"]], BILL_HIST_KEYS)
+        return cls(_aggregate(frame.drop(columns=["bill_bin", "bmi_band"])), bill_hist, shift)
+
+    def merge(self, *others):
+        """One cube from this and other cubes built with the same shift."""
+        for other in others:
+            if other.shift != self.shift:
+                raise ValueError("Cubes built with different shifts cannot be merged")
+        cubes = (self,) + others
+        cells = _aggregate(_concat(cube.cells for cube in cubes))
+        bill_hist = _aggregate(_concat(cube.bill_hist for cube in cubes), BILL_HIST_KEYS)
+        return DataCube(cells, bill_hist, self.shift)
+
+    def values(self, dimension):
+        """Values of ``dimension`` in the cube, then ``None`` if some rows have none."""
+        column = self.cells[dimension]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            present = set(column.dropna())
+            values = [value for value in column.cat.categories if value in present]
+        else:
+            values = sorted(column.dropna().unique().tolist())
+            # whole-number floats (an age column with gaps) read back as ints
+            if all(float(value).is_integer() for value in values):
+                values = [int(value) for value in values]
+        return values + [None] if column.isna().any() else values
+
+    def select(self, values=None, ranges=None):
+        """Boolean mask over cells. ``ranges`` on ``bmi`` are inclusive and match whole bins."""
+        return _mask(self.cells, values, ranges)
+
+    def totals(self, mask=None):
+        """Count, mean and variance of each measure over the selected cells."""
+        cells = self.cells if mask is None else self.cells[mask]
+        result = {"count": int(cells["count"].sum())}
+        for measure in MEASURES:
+            present = int(cells[f"n_{measure}"].sum())
+            total = float(cells[f"sum_{measure}"].sum())
+            mean = total / present if present else np.nan
+            # sum of squares about the shift, moved to the selection's own mean
+            centered = float(cells[f"sumsq_{measure}"].sum()) - present * (mean - self.shift[measure]) ** 2
+            result[f"mean_{measure}"] = mean
+            result[f"var_{measure}"] = centered / (present - 1) if present > 1 else np.nan
+        return result
+
+    def bmi_bounds(self):
+        """Smallest and largest BMI in the cube, at BMI_BIN precision."""
+        bins = self.cells["bmi_bin"]
+        bins = bins[bins != MISSING_BIN]
+        return round(float(bins.min()) * BMI_BIN, 1), round(float(bins.max()) * BMI_BIN, 1)
+
+    def correlation(self, mask=None):
+        """Pearson correlation of the measures over the selected cells, as ``DataFrame.corr``.
+
+        Each pair uses the rows where both measures are present.
+        """
+        cells = self.cells if mask is None else self.cells[mask]
+        counts, sums, squares, products = self._moments(cells.drop(columns=DIMENSIONS).sum())
+        # products about the shift, moved to each pair's own means
+        with np.errstate(divide="ignore", invalid="ignore"):
+            offset = sums / counts - self.shift_vector[:, None]
+        spread = squares - counts * offset ** 2
+        scatter = products - counts * offset * offset.T
+        # like pandas, a pair with fewer than two rows or a measure without spread is NaN;
+        # a constant column's spread is only cancellation error, so compare to the raw sums
+        usable = (counts > 1) & (spread > 1e-10 * squares) & (spread.T > 1e-10 * squares.T)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = np.where(usable, scatter / np.sqrt(np.abs(spread * spread.T)), np.nan)
+        return pd.DataFrame(np.clip(corr, -1, 1), index=MEASURES, columns=MEASURES)
+
+    def group(self, by, mask=None):
+        """Count and mean of each measure per value of the dimensions in ``by``."""
+        cells = self.cells if mask is None else self.cells[mask]
+        sums = ["count"] + [f"{stat}_{measure}" for measure in MEASURES for stat in ("n", "sum")]
+        grouped = cells.groupby(by, observed=True, sort=True)[sums].sum()
+        result = pd.DataFrame({"count": grouped["count"]})
+        for measure in MEASURES:
+            result[f"mean_{measure}"] = grouped[f"sum_{measure}"] / grouped[f"n_{measure}"]
+        return result
+
+    def bill_histogram(self, values=None, ranges=None):
+        """Counts and edges of hospital_bill in BILL_BIN_WIDTH bins for the filtered rows.
+
+        A ``bmi`` range is widened to whole ``BILL_HIST_BMI_BIN`` bands.
+        """
+        entries = self.bill_hist[_mask(self.bill_hist, values, ranges, "bmi_band", bmi_bands)]
+        entries = entries[entries["bill_bin"] != MISSING_BIN]
+        if entries.empty:
+            return np.zeros(0, dtype=np.int64), np.zeros(1)
+        bins = entries["bill_bin"].to_numpy()
+        first = int(bins.min())
+        counts = np.bincount(bins - first, weights=entries["count"].to_numpy()).astype(np.int64)
+        edges = (first + np.arange(len(counts) + 1)) * float(BILL_BIN_WIDTH)
+        return counts, edges
+
+    def age_histogram(self, mask=None):
+        """Counts and edges with one bin per year of age for the selected cells."""
+        counts = self.group("age", mask)["count"]
+        counts = counts[counts.index.notna()]
+        if counts.empty:
+            return np.zeros(0, dtype=np.int64), np.zeros(1)
+        ages = counts.index.to_numpy(dtype=np.int64)
+        full = np.zeros(ages.max() - ages.min() + 1, dtype=np.int64)
+        full[ages - ages.min()] = counts.to_numpy()
+        edges = ages.min() - 0.5 + np.arange(len(full) + 1)
+        return full, edges
+
+
+def cube_dir_for(csv_path, cube_dir=CUBE_DIR):
+    return os.path.join(cube_dir, os.path.splitext(os.path.basename(csv_path))[0])
+
+
+def stream_cube(csv_path=EDA_DATA_PATH, chunk_rows=CHUNK_ROWS, merge_every=MERGE_EVERY):
+    """Cube of a CSV of any size, read from its columnar store ``chunk_rows`` rows at a time.
+
+    The store is converted out-of-core and memory-mapped, so every chunk has
+    the whole file's dtypes and categories. Chunk cubes are merged into the
+    running total ``merge_every`` at a time, so memory holds at most that
+    many partial cubes besides the total.
+    """
+    cube, partials = None, []
+    for batch in load_table(csv_path).to_batches(max_chunksize=chunk_rows):
+        chunk = batch.to_pandas()
+        if cube is None:
+            # the first chunk's means are close enough to the data's to serve as the shift
+            cube = DataCube.from_frame(chunk)
+            continue
+        partials.append(DataCube.from_frame(chunk, cube.shift))
+        if len(partials) >= merge_every:
+            cube, partials = cube.merge(*partials), []
+    if cube is None:
+        raise ValueError(f"{csv_path} has no rows")
+    return cube.merge(*partials) if partials else cube
+
+
+def build_cube(csv_path=EDA_DATA_PATH, output_dir=None, chunk_rows=None):
+    output_dir = output_dir or cube_dir_for(csv_path)
+    os.makedirs(output_dir, exist_ok=True)
+
+    if chunk_rows is None and os.path.getsize(csv_path) > STREAM_THRESHOLD_BYTES:
+        chunk_rows = CHUNK_ROWS
+    if chunk_rows:
+        cube = stream_cube(csv_path, chunk_rows)
+    else:
+        cube = DataCube.from_frame(load_columnar(csv_path))
+    for name, frame in ((CELLS_FILE, cube.cells), (BILL_HIST_FILE, cube.bill_hist)):
+        path = os.path.join(output_dir, name)
+        feather.write_feather(frame, f"{path}.tmp", compression="uncompressed")
+        os.replace(f"{path}.tmp", path)
+    write_json(os.path.join(output_dir, META_FILE), {
+        "cube_version": CUBE_VERSION,
+        "source": os.path.basename(csv_path),
+        "source_sha256": file_sha256(csv_path),
+        "rows": cube.n_rows,
+        "cells": cube.n_cells,
+        "shift": cube.shift,
+        "chunk_rows": chunk_rows,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    })
+    return output_dir
+
+
+def load_cube(csv_path=EDA_DATA_PATH, output_dir=None, force=False, chunk_rows=None):
+    """The cube for ``csv_path``, rebuilt first if missing or stale."""
+    output_dir = output_dir or cube_dir_for(csv_path)
+    meta_path = os.path.join(output_dir, META_FILE)
+    stale = (
+        force or not os.path.exists(meta_path)
+        or read_json(meta_path).get("cube_version") != CUBE_VERSION
+        or read_json(meta_path).get("source_sha256") != file_sha256(csv_path)
+    )
+    if stale:
+        build_cube(csv_path, output_dir, chunk_rows)
+    meta = read_json(meta_path)
+    return DataCube(
+        feather.read_feather(os.path.join(output_dir, CELLS_FILE)),
+        feather.read_feather(os.path.join(output_dir, BILL_HIST_FILE)),
+        meta["shift"],
+    )
+
+
+def check_stream(csv_path=EDA_DATA_PATH, chunk_rows=CHUNK_ROWS, tolerance=1e-9):
+    """Largest differences between the streamed and the in-memory cube of ``csv_path``.
+
+    Compares the totals, the correlation matrix and the per-state means, with
+    missing values in the same places; ``ok`` is whether all are within
+    ``tolerance``, relative to the in-memory value.
+    """
+    streamed = stream_cube(csv_path, chunk_rows)
+    in_memory = DataCube.from_frame(load_columnar(csv_path))
+
+    def difference(a, b):
+        a, b = np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64)
+        if not np.array_equal(np.isnan(a), np.isnan(b)):
+            return np.inf
+        with np.errstate(invalid="ignore"):
+            return float(np.nan_to_num(np.abs(a - b) / np.maximum(np.abs(b), 1.0)).max(initial=0.0))
+
+    totals = streamed.totals(), in_memory.totals()
+    groups = streamed.group("state"), in_memory.group("state")
+    result = {
+        "rows": (streamed.n_rows, in_memory.n_rows),
+        "totals": difference([totals[0][key] for key in totals[1]], list(totals[1].values())),
+        "correlation": difference(streamed.correlation(), in_memory.correlation()),
+        "group": difference(groups[0].to_numpy(), groups[1].reindex_like(groups[0]).to_numpy()),
+    }
+    result["ok"] = (
+        streamed.n_rows == in_memory.n_rows and groups[0].index.equals(groups[1].index)
+        and max(result["totals"], result["correlation"], result["group"]) <= tolerance
+    )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the EDA data cube for a cleaned CSV.")
+    parser.add_argument("--csv", default=EDA_DATA_PATH)
+    parser.add_argument("--force", action="store_true")
+    parser.add_argument("--chunk-rows", type=int, default=None,
+                        help=f"stream the CSV in chunks of this many rows (default: only above "
+                             f"{STREAM_THRESHOLD_BYTES // 2**20} MB, in chunks of {CHUNK_ROWS:,})")
+    parser.add_argument("--check", action="store_true",
+                        help="compare a streamed cube of the CSV with the in-memory one and exit")
+    args = parser.parse_args()
+
+    if args.check:
+        result = check_stream(args.csv, args.chunk_rows or CHUNK_ROWS)
+        print(f"streamed vs in-memory cube of {args.csv} ({result['rows'][0]:,} rows)")
+        for key in ("totals", "correlation", "group"):
+            print(f"  {key:<12}max relative difference {result[key]:.2e}")
+        print("ok" if result["ok"] else "MISMATCH")
+        raise SystemExit(0 if result["ok"] else 1)
+
+    cube = load_cube(args.csv, force=args.force, chunk_rows=args.chunk_rows)
+    print(f"{cube.n_rows:,} rows in {cube.n_cells:,} cells -> {cube_dir_for(args.csv)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,393 @@
+"""Precomputed evaluation artifacts for the Model Evaluation page.
+
+An artifact holds everything the page shows for one model: the holdout
+metrics with bootstrap confidence intervals, the feature importances, the
+test-set predictions and residuals, error sums per segment, and the serving
+cost (single-quote latency and batch throughput). It is
+written once to ``cache/evaluation/<model name>/`` and keyed by the SHA-256
+of the model file and of the dataset, so it is rebuilt only when either of
+them changes.
+
+``compare_models`` evaluates every pipeline in ``models/`` on the same
+holdout, building stale artifacts in parallel worker processes. Serving
+cost is never measured next to other work: it is added to each artifact
+afterwards, one model at a time, so latencies compare across models.
+
+Usage:
+    python -m src.evaluation [--model models/xg_model_pipeline.pkl] [--force]
+    python -m src.evaluation --compare [--workers 3]
+"""
+import argparse
+import concurrent.futures
+import hashlib
+import multiprocessing
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from sklearn.model_selection import train_test_split
+
+from src.artifacts import CACHE_DIR, DATA_DIR, MODELS_DIR, file_sha256, read_json, write_json
+from src.features import CATEGORICAL_FEATURES, NUMERICAL_FEATURES, TARGET_COLUMN
+from src.model_store import model_paths
+
+EVAL_VERSION = 7
+EVAL_DIR = os.path.join(CACHE_DIR, "evaluation")
+EVAL_DATA_PATH = os.path.join(DATA_DIR, "cleaned", "cleaned_nigeria_medical_insurance.csv")
+XG_MODEL_PATH = os.path.join(MODELS_DIR, "xg_model_pipeline.pkl")
+META_FILE = "meta.json"
+PREDICTIONS_FILE = "predictions.npz"
+SEGMENTS_FILE = "segments.csv"
+
+# holdout used when the models were trained
+TEST_SIZE = 0.2
+RANDOM_STATE = 42
+
+# bootstrap confidence intervals; the resample weights of all workers together
+# hold at most BOOTSTRAP_BLOCK_ELEMENTS values so memory stays flat on large holdouts
+BOOTSTRAP_RESAMPLES = 10_000
+BOOTSTRAP_CONFIDENCE = 0.95
+BOOTSTRAP_BLOCK_ELEMENTS = 1 << 23
+BOOTSTRAP_MAX_WORKERS = 4
+
+# segment error analysis: band edges are left-closed, missing ages get their own band
+# and rows without a state or smoker status their own label
+SEGMENT_KEYS = ["state", "smoker", "age_band", "bmi_band"]
+AGE_BANDS = ([0, 30, 40, 50, 60, np.inf], ["<30", "30-39", "40-49", "50-59", "60+"])
+BMI_BANDS = ([0, 18.5, 25, 30, 35, np.inf], ["<18.5", "18.5-24.9", "25-29.9", "30-34.9", "35+"])
+MISSING_BAND = "Unknown"
+MISSING_LABEL = "Missing"
+SEGMENT_DTYPES = {
+    "state": str,
+    "smoker": str,
+    "age_band": pd.CategoricalDtype(AGE_BANDS[1] + [MISSING_BAND], ordered=True),
+    "bmi_band": pd.CategoricalDtype(BMI_BANDS[1] + [MISSING_BAND], ordered=True),
+}
+
+# serving cost measurement
+LATENCY_QUOTES = 200
+THROUGHPUT_ROWS = 20_000
+
+
+def load_holdout(data_path=EVAL_DATA_PATH):
+    """The same train/test split as training; returns X_train, X_test, y_train, y_test."""
+    df = pd.read_csv(data_path)
+    X = df[NUMERICAL_FEATURES + CATEGORICAL_FEATURES]
+    y = df[TARGET_COLUMN]
+    return train_test_split(X, y, test_size=TEST_SIZE, random_state=RANDOM_STATE)
+
+
+def regression_metrics(y_true, y_pred):
+    mse = mean_squared_error(y_true, y_pred)
+    return {
+        "r2": float(r2_score(y_true, y_pred)),
+        "mae": float(mean_absolute_error(y_true, y_pred)),
+        "mse": float(mse),
+        "rmse": float(np.sqrt(mse)),
+    }
+
+
+def bootstrap_intervals(y_true, y_pred, n_resamples=BOOTSTRAP_RESAMPLES, confidence=BOOTSTRAP_CONFIDENCE,
+                        seed=RANDOM_STATE, max_workers=None):
+    """Percentile bootstrap intervals for R², MAE, MSE and RMSE.
+
+    Every metric is a function of four row sums (|e|, e², y and y², with y
+    shifted by its mean). A resample is drawn as multinomial row weights (the
+    ``bincount`` of n random row indices), so a block of resamples is one
+    weight matrix of shape (resamples, rows) times the (rows, 4) matrix of
+    row statistics and nothing is gathered. Each block is a fixed share of
+    ``BOOTSTRAP_BLOCK_ELEMENTS`` for one of at most ``BOOTSTRAP_MAX_WORKERS``
+    threads and is seeded independently, so memory is bounded and results do
+    not depend on the number of workers.
+    """
+    y_true = np.asarray(y_true, dtype=np.float64)
+    y_pred = np.asarray(y_pred, dtype=np.float64)
+    n_rows = len(y_true)
+    error = y_true - y_pred
+    centered = y_true - y_true.mean()
+    row_stats = np.column_stack((np.abs(error), error * error, centered, centered * centered))
+
+    sums = np.empty((row_stats.shape[1], n_resamples), dtype=np.float64)
+    block_size = max(1, BOOTSTRAP_BLOCK_ELEMENTS // (BOOTSTRAP_MAX_WORKERS * n_rows))
+    starts = range(0, n_resamples, block_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(starts))
+    index_dtype = np.int32 if n_rows < 2**31 else np.int64
+
+    def resample_block(start, block_seed):
+        rng = np.random.default_rng(block_seed)
+        weights = np.empty((min(block_size, n_resamples - start), n_rows), dtype=np.float64)
+        for row in weights:
+            row[:] = np.bincount(rng.integers(0, n_rows, size=n_rows, dtype=index_dtype), minlength=n_rows)
+        sums[:, start:start + len(weights)] = (weights @ row_stats).T
+
+    workers = min(max_workers or os.cpu_count(), BOOTSTRAP_MAX_WORKERS)
+    with concurrent.futures.ThreadPoolExecutor(workers) as pool:
+        list(pool.map(resample_block, starts, seeds))
+
+    abs_sum, sq_sum, y_sum, y_sq_sum = sums
+    mse = sq_sum / n_rows
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r2 = 1.0 - sq_sum / (y_sq_sum - y_sum * y_sum / n_rows)
+    samples = {"r2": r2, "mae": abs_sum / n_rows, "mse": mse, "rmse": np.sqrt(mse)}
+
+    tail = (1.0 - confidence) / 2 * 100
+    return {
+        "confidence": confidence,
+        "n_resamples": n_resamples,
+        "seed": seed,
+        "intervals": {
+            name: [float(bound) for bound in np.nanpercentile(values, [tail, 100 - tail])]
+            for name, values in samples.items()
+        },
+    }
+
+
+def _band(values, bands):
+    edges, labels = bands
+    banded = pd.cut(values, edges, labels=labels, right=False)
+    return banded.cat.add_categories(MISSING_BAND).fillna(MISSING_BAND)
+
+
+def segment_errors(X, y_true, y_pred):
+    """Error sums for every state x smoker x age band x BMI band cell, in one groupby.
+
+    Cells hold sufficient statistics (count and the sums of error, |error| and
+    error², with error = predicted - actual), so any coarser segmentation is a
+    regroup of the cells with ``segment_table``; no predictions are needed.
+    Every row lands in a cell, so the cell counts add up to the rows scored.
+    """
+    error = np.asarray(y_pred, dtype=np.float64) - np.asarray(y_true, dtype=np.float64)
+    frame = pd.DataFrame({
+        "state": X["state"].astype(object).fillna(MISSING_LABEL).to_numpy(),
+        "smoker": X["smoker"].astype(object).fillna(MISSING_LABEL).to_numpy(),
+        "age_band": _band(X["age"], AGE_BANDS).to_numpy(),
+        "bmi_band": _band(X["bmi"], BMI_BANDS).to_numpy(),
+        "error": error,
+        "abs_error": np.abs(error),
+        "sq_error": error * error,
+    })
+    cells = frame.groupby(SEGMENT_KEYS, observed=True, sort=True, dropna=False).agg(
+        count=("error", "size"),
+        error_sum=("error", "sum"),
+        abs_error_sum=("abs_error", "sum"),
+        sq_error_sum=("sq_error", "sum"),
+    )
+    return cells.reset_index()
+
+
+def segment_table(cells, by, filters=None):
+    """MAE, RMSE, bias (mean predicted - actual) and count per segment of ``by``.
+
+    ``filters`` maps a segment key to the values to keep before regrouping.
+    """
+    for key, values in (filters or {}).items():
+        cells = cells[cells[key].isin(values)]
+    sums = ["count", "error_sum", "abs_error_sum", "sq_error_sum"]
+    if by:
+        grouped = cells.groupby(list(by), observed=True, sort=True)[sums].sum()
+    else:
+        grouped = cells[sums].groupby(lambda _: "All").sum()
+    count = grouped["count"]
+    return pd.DataFrame({
+        "count": count,
+        "mae": grouped["abs_error_sum"] / count,
+        "rmse": np.sqrt(grouped["sq_error_sum"] / count),
+        "bias": grouped["error_sum"] / count,
+    })
+
+
+def feature_importances(model):
+    """Importance per encoded feature: ``feature_importances_``, or |coef| for linear models."""
+    estimator = model.steps[-1][1]
+    if hasattr(estimator, "feature_importances_"):
+        importance, kind = estimator.feature_importances_, "importance"
+    else:
+        importance, kind = np.abs(np.ravel(estimator.coef_)), "abs_coefficient"
+
+    names = model.named_steps["preprocessor"].get_feature_names_out()
+    return {"kind": kind, "features": [str(name) for name in names], "values": [float(v) for v in importance]}
+
+
+def serving_cost(scorer, X_test, n_quotes=LATENCY_QUOTES, n_rows=THROUGHPUT_ROWS):
+    """Single-quote latency (p50/p99, ms) and batch throughput (rows/s) through the scorer."""
+    quotes = X_test.to_dict("records")
+    scorer.predict_one(quotes[0])
+    latencies = []
+    for i in range(n_quotes):
+        quote = quotes[i % len(quotes)]
+        start = time.perf_counter()
+        scorer.predict_one(quote)
+        latencies.append(time.perf_counter() - start)
+    p50, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 99])
+
+    # the holdout is small, so repeat it to a realistic batch; best of three runs
+    batch = X_test.iloc[np.arange(n_rows) % len(X_test)]
+    timings = []
+    for _ in range(3):
+        start = time.perf_counter()
+        scorer.predict_many(batch)
+        timings.append(time.perf_counter() - start)
+
+    return {
+        "latency_p50_ms": round(float(p50), 4),
+        "latency_p99_ms": round(float(p99), 4),
+        "throughput_rows_s": round(n_rows / min(timings), 1),
+        "batch_rows": n_rows,
+    }
+
+
+def evaluation_key(model_path=XG_MODEL_PATH, data_path=EVAL_DATA_PATH):
+    digest = hashlib.sha256()
+    for part in (str(EVAL_VERSION), file_sha256(model_path), file_sha256(data_path)):
+        digest.update(part.encode())
+    return digest.hexdigest()
+
+
+def evaluation_dir_for(model_path, eval_dir=EVAL_DIR):
+    return os.path.join(eval_dir, os.path.splitext(os.path.basename(model_path))[0])
+
+
+def build_evaluation(model_path=XG_MODEL_PATH, data_path=EVAL_DATA_PATH, output_dir=None, key=None):
+    """Write the artifact for ``model_path``, all but its serving cost (see ``add_serving_cost``)."""
+    from src.scoring import load_model
+
+    output_dir = output_dir or evaluation_dir_for(model_path)
+    os.makedirs(output_dir, exist_ok=True)
+
+    _, X_test, _, y_test = load_holdout(data_path)
+    model = load_model(model_path)
+    y_pred = model.predict(X_test)
+    y_true = y_test.to_numpy(dtype=np.float64)
+
+    np.savez(
+        os.path.join(output_dir, PREDICTIONS_FILE),
+        index=y_test.index.to_numpy(),
+        y_true=y_true,
+        y_pred=np.asarray(y_pred, dtype=np.float64),
+        residual=y_true - y_pred,
+    )
+    segment_errors(X_test, y_true, y_pred).to_csv(os.path.join(output_dir, SEGMENTS_FILE), index=False)
+    # meta last: its key is what marks the artifact as complete
+    write_json(os.path.join(output_dir, META_FILE), {
+        "version": EVAL_VERSION,
+        "key": key or evaluation_key(model_path, data_path),
+        "model": os.path.basename(model_path),
+        "estimator": type(model.steps[-1][1]).__name__,
+        "dataset": os.path.relpath(data_path, DATA_DIR),
+        "n_test": int(len(y_test)),
+        "metrics": regression_metrics(y_test, y_pred),
+        "bootstrap": bootstrap_intervals(y_true, y_pred),
+        "importances": feature_importances(model),
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    })
+    return output_dir
+
+
+def add_serving_cost(model_path=XG_MODEL_PATH, data_path=EVAL_DATA_PATH, output_dir=None):
+    """Measure the serving cost of ``model_path`` and add it to its artifact.
+
+    Run on its own, after any parallel builds have finished, so the
+    latencies are not measured under contention.
+    """
+    from src.scoring import load_scorer
+
+    meta_path = os.path.join(output_dir or evaluation_dir_for(model_path), META_FILE)
+    _, X_test, _, _ = load_holdout(data_path)
+    meta = read_json(meta_path)
+    meta["serving"] = serving_cost(load_scorer(model_path), X_test)
+    write_json(meta_path, meta)
+
+
+def load_evaluation(model_path=XG_MODEL_PATH, data_path=EVAL_DATA_PATH, eval_dir=EVAL_DIR, force=False):
+    """Read the artifact for ``model_path``, rebuilding it first if it is missing or stale.
+
+    Returns the meta dict with a ``predictions`` DataFrame (y_true, y_pred,
+    residual) indexed like the test split and the ``segments`` cells.
+    """
+    output_dir = evaluation_dir_for(model_path, eval_dir)
+    meta_path = os.path.join(output_dir, META_FILE)
+    key = evaluation_key(model_path, data_path)
+    if force or not os.path.exists(meta_path) or read_json(meta_path).get("key") != key:
+        build_evaluation(model_path, data_path, output_dir, key)
+    if "serving" not in read_json(meta_path):
+        add_serving_cost(model_path, data_path, output_dir)
+
+    evaluation = read_json(meta_path)
+    with np.load(os.path.join(output_dir, PREDICTIONS_FILE)) as arrays:
+        evaluation["predictions"] = pd.DataFrame(
+            {name: arrays[name] for name in ("y_true", "y_pred", "residual")},
+            index=arrays["index"],
+        )
+    evaluation["segments"] = pd.read_csv(os.path.join(output_dir, SEGMENTS_FILE), dtype=SEGMENT_DTYPES)
+    return evaluation
+
+
+def compare_models(paths=None, data_path=EVAL_DATA_PATH, eval_dir=EVAL_DIR, max_workers=None):
+    """Evaluate every model on the same holdout; returns their evaluations in ``paths`` order.
+
+    Up-to-date artifacts are read in-process. Stale ones are rebuilt in a
+    process pool, one model per worker, and their serving cost is then
+    measured here, one model at a time, once the pool has finished.
+    """
+    paths = paths or model_paths()
+    fresh, stale = [], []
+    for path in paths:
+        meta_path = os.path.join(evaluation_dir_for(path, eval_dir), META_FILE)
+        up_to_date = os.path.exists(meta_path) and read_json(meta_path).get("key") == evaluation_key(path, data_path)
+        (fresh if up_to_date else stale).append(path)
+
+    if stale:
+        context = multiprocessing.get_context("spawn")
+        with concurrent.futures.ProcessPoolExecutor(max_workers or len(stale), mp_context=context) as pool:
+            futures = [
+                pool.submit(build_evaluation, path, data_path, evaluation_dir_for(path, eval_dir))
+                for path in stale
+            ]
+            for future in futures:
+                future.result()
+    # serially, so serving cost is measured with nothing else running
+    return [load_evaluation(path, data_path, eval_dir) for path in paths]
+
+
+def comparison_table(evaluations):
+    """One row per model: holdout metrics next to serving cost."""
+    rows = []
+    for evaluation in evaluations:
+        rows.append({
+            "model": os.path.splitext(evaluation["model"])[0],
+            "estimator": evaluation["estimator"],
+            **evaluation["metrics"],
+            **{name: value for name, value in evaluation["serving"].items() if name != "batch_rows"},
+        })
+    return pd.DataFrame(rows).set_index("model")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the model evaluation artifact.")
+    parser.add_argument("--model", default=XG_MODEL_PATH)
+    parser.add_argument("--data", default=EVAL_DATA_PATH)
+    parser.add_argument("--force", action="store_true", help="rebuild even if the artifact is up to date")
+    parser.add_argument("--compare", action="store_true", help="evaluate every model in models/")
+    parser.add_argument("--workers", type=int, default=None, help="--compare: worker processes")
+    args = parser.parse_args()
+
+    if args.compare:
+        table = comparison_table(compare_models(data_path=args.data, max_workers=args.workers))
+        print("=" * 60)
+        print("MODEL COMPARISON")
+        print("=" * 60)
+        print(table.drop(columns="estimator").to_string(float_format=lambda value: f"{value:,.4f}"))
+        return
+
+    evaluation = load_evaluation(args.model, args.data, force=args.force)
+    print(f"{evaluation['model']} on {evaluation['n_test']} holdout rows ({evaluation_dir_for(args.model)})")
+    intervals = evaluation["bootstrap"]["intervals"]
+    print(f"  {'':<5}{'estimate':>28}  {evaluation['bootstrap']['confidence']:.0%} bootstrap interval")
+    for name, value in evaluation["metrics"].items():
+        print(f"  {name.upper():<5}{value:>28,.4f}  [{intervals[name][0]:,.4f}, {intervals[name][1]:,.4f}]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""Input schema and feature encoding shared by the scoring modules.
+
+Only numpy is imported here so the encoder can be used by light-weight
+workers that never unpickle the sklearn pipeline.
+"""
+import numpy as np
+
+NUMERICAL_FEATURES = ["age", "bmi", "children"]
+CATEGORICAL_FEATURES = ["gender", "smoker", "state"]
+INPUT_COLUMNS = ["age", "gender", "state", "bmi", "children", "smoker"]
+TARGET_COLUMN = "hospital_bill"
+
+# options offered by the predictor form
+GENDER_OPTIONS = ["Female", "Male", "Unknown"]
+STATE_OPTIONS = ["Lagos", "Abuja", "Rivers", "Kano", "Kaduna", "Oyo", "Enugu", "Anambra", "Edo", "Delta"]
+SMOKER_OPTIONS = ["Yes", "No"]
+
+# numeric bounds of the predictor form
+AGE_RANGE = (20, 85)
+BMI_RANGE = (15.0, 50.0)
+CHILDREN_RANGE = (0, 10)
+
+
+def is_nan(value):
+    # sklearn's SimpleImputer only treats NaN as missing in categorical columns,
+    # a None is encoded like any other unseen category
+    return isinstance(value, float) and value != value
+
+
+def _python_value(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def build_feature_spec(preprocessor):
+    """Describe each output column of a fitted ColumnTransformer as plain data.
+
+    The spec is a list of dicts in ``get_feature_names_out()`` order and only
+    holds JSON-friendly values, so it can be stored next to exported models.
+    """
+    spec = []
+    for name, transformer, columns in preprocessor.transformers_:
+        if name == "remainder" or transformer == "drop":
+            continue
+        steps = [step for _, step in transformer.steps] if hasattr(transformer, "steps") else [transformer]
+
+        for position, column in enumerate(columns):
+            fill, shift, scale, encoder = None, 0.0, 1.0, None
+            for step in steps:
+                step_type = type(step).__name__
+                if step_type == "SimpleImputer":
+                    fill = _python_value(step.statistics_[position])
+                elif step_type == "StandardScaler":
+                    shift = float(step.mean_[position]) if step.mean_ is not None else 0.0
+                    scale = float(step.scale_[position]) if step.scale_ is not None else 1.0
+                elif step_type in ("OrdinalEncoder", "OneHotEncoder"):
+                    encoder = step
+                else:
+                    raise ValueError(f"Unsupported preprocessing step: {step_type}")
+
+            if encoder is None:
+                spec.append({"column": column, "kind": "numeric", "fill": fill, "shift": shift, "scale": scale})
+                continue
+
+            categories = [_python_value(c) for c in encoder.categories_[position]]
+            if type(encoder).__name__ == "OrdinalEncoder":
+                unknown = encoder.unknown_value if encoder.handle_unknown == "use_encoded_value" else None
+                spec.append({"column": column, "kind": "ordinal", "fill": fill, "categories": categories, "unknown": unknown})
+            else:
+                if encoder.drop_idx_ is not None:
+                    raise ValueError("OneHotEncoder with drop is not supported")
+                for category in categories:
+                    spec.append({"column": column, "kind": "onehot", "fill": fill, "category": category,
+                                 "ignore_unknown": encoder.handle_unknown != "error", "categories": categories})
+
+    names = list(preprocessor.get_feature_names_out())
+    if len(names) != len(spec):
+        raise ValueError("Feature spec does not match the preprocessor output")
+    for feature, feature_name in zip(spec, names):
+        feature["name"] = feature_name
+
+    return spec
+
+
+class FeatureEncoder:
+    """Encode raw quotes into the model feature matrix described by a spec."""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.feature_names = [feature["name"] for feature in spec]
+        self.n_features = len(spec)
+        self._lookups = [
+            {category: float(code) for code, category in enumerate(feature["categories"])}
+            if feature["kind"] != "numeric" else None
+            for feature in spec
+        ]
+
+    def _unknown(self, feature, value):
+        if feature["kind"] == "ordinal" and feature["unknown"] is not None:
+            return float(feature["unknown"])
+        if feature["kind"] == "onehot" and feature["ignore_unknown"]:
+            return 0.0
+        raise ValueError(f"Unknown {feature['column']}: {value!r}")
+
+    def encode_row(self, quote, out):
+        """Write one quote (a mapping of input fields) into the 1-D array ``out``."""
+        for i, (feature, lookup) in enumerate(zip(self.spec, self._lookups)):
+            value = quote.get(feature["column"])
+            if feature["kind"] == "numeric":
+                value = np.nan if value is None else float(value)
+            if is_nan(value) and feature["fill"] is not None:
+                value = feature["fill"]
+
+            if feature["kind"] == "numeric":
+                out[i] = (value - feature["shift"]) / feature["scale"]
+            elif feature["kind"] == "ordinal":
+                code = lookup.get(value)
+                out[i] = code if code is not None else self._unknown(feature, value)
+            elif value == feature["category"]:
+                out[i] = 1.0
+            else:
+                out[i] = 0.0 if value in lookup else self._unknown(feature, value)
+
+        return out
+
+    def encode_columns(self, data):
+        """Encode a DataFrame (or mapping of equal-length columns) into a 2-D array."""
+        n_rows = len(data[self.spec[0]["column"]])
+        X = np.empty((n_rows, self.n_features), dtype=np.float64)
+        codes_cache = {}
+
+        for i, feature in enumerate(self.spec):
+            values = data[feature["column"]]
+            if feature["kind"] == "numeric":
+                column = _float_column(values)
+                column = np.where(np.isnan(column), np.nan if feature["fill"] is None else feature["fill"], column)
+                X[:, i] = (column - feature["shift"]) / feature["scale"]
+                continue
+
+            # one categorical column feeds several one-hot features, encode it once
+            if feature["column"] not in codes_cache:
+                codes_cache[feature["column"]] = self._category_codes(feature, values)
+            codes = codes_cache[feature["column"]]
+
+            if feature["kind"] == "ordinal":
+                X[:, i] = codes
+            else:
+                X[:, i] = codes == feature["categories"].index(feature["category"])
+
+        return X
+
+    def _category_codes(self, feature, values):
+        # map the handful of distinct labels in Python, then broadcast the codes
+        values = np.asarray(values, dtype=object)
+        labels, first, inverse = np.unique(values.astype(str), return_index=True, return_inverse=True)
+        lookup = {category: code for code, category in enumerate(feature["categories"])}
+
+        label_codes = np.empty(len(labels), dtype=np.float64)
+        for j, index in enumerate(first):
+            value = values[index]
+            if is_nan(value) and feature["fill"] is not None:
+                value = feature["fill"]
+            code = lookup.get(value)
+            if code is None:
+                code = self._unknown(feature, value)
+                if feature["kind"] == "onehot":
+                    # ignored one-hot unknowns: -1 matches no category, so the row stays all zeros
+                    code = -1.0
+            label_codes[j] = code
+
+        return label_codes[inverse.reshape(-1)]
+
+
+def _float_column(values):
+    if hasattr(values, "to_numpy"):
+        return values.to_numpy(dtype=np.float64, na_value=np.nan)
+    return np.asarray(values, dtype=np.float64)
@@ -0,0 +1,52 @@
+"""Row filters for the EDA dashboard, evaluated one record batch at a time.
+
+The KPIs and charts answer the sidebar filters from the cube; rows are only
+needed for the Data Preview. ``filter_mask`` turns the same filters into a
+``pyarrow.compute`` boolean mask over one record batch of the memory-mapped
+columnar store, so selecting rows never holds more than a batch and builds
+no index over the whole dataset. Value filters (age, smoker, state) are
+``is_in`` tests, on the dictionary codes for categorical columns, and range
+filters (bmi) inclusive bounds. Rows with no value are kept when ``None`` is
+selected; range filters never match them.
+"""
+import pyarrow as pa
+import pyarrow.compute as pc
+
+
+def is_missing(value):
+    return value is None or (isinstance(value, float) and value != value)
+
+
+def value_mask(column, selected):
+    """Boolean array: rows of ``column`` whose value is in ``selected``."""
+    selected = list(selected)
+    present = [value for value in selected if not is_missing(value)]
+    if pa.types.is_dictionary(column.type):
+        # the store's dictionaries are shared by every batch, so compare codes
+        codes = pc.index_in(pa.array(present, column.type.value_type), value_set=column.dictionary)
+        mask = pc.is_in(column.indices, value_set=codes.drop_null())
+    else:
+        mask = pc.is_in(column, value_set=pa.array(present).cast(column.type))
+    if len(present) < len(selected):
+        mask = pc.or_(mask, pc.is_null(column))
+    return mask
+
+
+def range_mask(column, low, high):
+    """Boolean array: rows with ``low <= column <= high``; missing values never match."""
+    mask = pc.and_(pc.greater_equal(column, low), pc.less_equal(column, high))
+    return pc.fill_null(mask, False)
+
+
+def filter_mask(batch, values=None, ranges=None):
+    """AND of every filter over the rows of ``batch``; None when no filter is given.
+
+    ``values`` maps a column to the values to keep and ``ranges`` a column
+    to inclusive ``(low, high)`` bounds.
+    """
+    parts = [value_mask(batch.column(column), selected) for column, selected in (values or {}).items()]
+    parts += [range_mask(batch.column(column), low, high) for column, (low, high) in (ranges or {}).items()]
+    mask = None
+    for part in parts:
+        mask = part if mask is None else pc.and_(mask, part)
+    return mask
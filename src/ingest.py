@@ -0,0 +1,158 @@
+"""Parallel ingestion of many raw partner files into one cleaned, deduplicated Parquet file.
+
+Every file is cleaned by ``src.cleaning.stream_clean`` in a worker process,
+into a temporary Parquet part next to the output, and the worker returns the
+uint64 ``row_hashes`` of the rows it kept rather than the rows. The parent
+takes the files in the order given and keeps a row only if its hash has not
+been seen before, so the first occurrence wins as with ``drop_duplicates``
+on the concatenated files. The only state shared across files is one sorted
+uint64 array, 8 bytes per distinct row. The kept rows of each part are then
+copied into the output row group by row group, while later files are still
+being cleaned.
+
+Two different rows with the same 64-bit hash would be dropped as duplicates;
+the chance of any such collision is about 1 in 4,000 at 100M distinct rows.
+
+Usage:
+    python -m src.ingest partner_2024_01.csv partner_2024_02.csv ... --output cleaned.parquet
+                         [--workers 8] [--chunk-rows 500000]
+"""
+import argparse
+import concurrent.futures
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.cleaning import CHUNK_ROWS, parquet_schema, stream_clean
+
+COPY_BATCH_ROWS = 65_536
+
+
+class RowHashSet:
+    """Sorted uint64 hashes of the rows kept so far."""
+
+    def __init__(self):
+        self.hashes = np.zeros(0, dtype=np.uint64)
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def add_new(self, hashes):
+        """Mask of the rows to keep: first occurrence of a hash not seen before. Adds them to the set."""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        keep = np.zeros(len(hashes), dtype=bool)
+        new, first = np.unique(hashes, return_index=True)
+        keep[first] = True
+
+        # drop hashes already in the set, then insert the rest in sorted position
+        positions = np.searchsorted(self.hashes, new)
+        found = np.zeros(len(new), dtype=bool)
+        inside = positions < len(self.hashes)
+        found[inside] = self.hashes[positions[inside]] == new[inside]
+        keep[first[found]] = False
+        self.hashes = np.insert(self.hashes, positions[~found], new[~found])
+        return keep
+
+
+def _clean_part(input_path, part_path, chunk_rows):
+    # worker: clean one file into its part and hand back counts and row hashes
+    start = time.perf_counter()
+    result = stream_clean(input_path, part_path, chunk_rows, hash_rows=True)
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def _copy_kept(part_path, keep, writer):
+    offset = 0
+    for batch in pq.ParquetFile(part_path).iter_batches(batch_size=COPY_BATCH_ROWS):
+        mask = keep[offset:offset + batch.num_rows]
+        offset += batch.num_rows
+        if mask.any():
+            writer.write_table(pa.Table.from_batches([batch.filter(pa.array(mask))]))
+
+
+def ingest_files(paths, output_path, max_workers=None, chunk_rows=CHUNK_ROWS):
+    """Clean ``paths`` in parallel into ``output_path``, dropping rows already seen in earlier files."""
+    start = time.perf_counter()
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(output_dir, exist_ok=True)
+    parts_dir = tempfile.mkdtemp(prefix=".ingest-", dir=output_dir)
+    tmp_path = f"{output_path}.tmp"
+    part_paths = [os.path.join(parts_dir, f"part-{i:05d}.parquet") for i in range(len(paths))]
+    workers = max_workers or min(len(paths), os.cpu_count())
+    seen = RowHashSet()
+    files = []
+    try:
+        context = multiprocessing.get_context("spawn")
+        with concurrent.futures.ProcessPoolExecutor(workers, mp_context=context) as pool:
+            futures = [
+                pool.submit(_clean_part, path, part_path, chunk_rows)
+                for path, part_path in zip(paths, part_paths)
+            ]
+            with pq.ParquetWriter(tmp_path, parquet_schema()) as writer:
+                # in file order, so earlier files win; later files keep cleaning meanwhile
+                for path, part_path, future in zip(paths, part_paths, futures):
+                    part = future.result()
+                    keep = seen.add_new(part["row_hashes"])
+                    _copy_kept(part_path, keep, writer)
+                    os.remove(part_path)
+                    rows_kept = int(keep.sum())
+                    files.append({
+                        "file": path,
+                        "rows_read": part["rows_read"],
+                        "rows_dropped": part["rows_read"] - part["rows_kept"],
+                        "duplicates": part["rows_kept"] - rows_kept,
+                        "rows_kept": rows_kept,
+                        "seconds": part["seconds"],
+                        "rows_per_second": part["rows_read"] / part["seconds"] if part["seconds"] else 0.0,
+                    })
+        os.replace(tmp_path, output_path)
+    finally:
+        shutil.rmtree(parts_dir, ignore_errors=True)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    elapsed = time.perf_counter() - start
+    rows_read = sum(entry["rows_read"] for entry in files)
+    return {
+        "files": files,
+        "rows_read": rows_read,
+        "rows_dropped": sum(entry["rows_dropped"] for entry in files),
+        "duplicates": sum(entry["duplicates"] for entry in files),
+        "rows_kept": sum(entry["rows_kept"] for entry in files),
+        "workers": workers,
+        "seconds": elapsed,
+        "rows_per_second": rows_read / elapsed if elapsed else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clean and deduplicate many raw medical insurance CSVs.")
+    parser.add_argument("inputs", nargs="+", help="raw CSV files, earliest first; earlier files win on duplicates")
+    parser.add_argument("--output", required=True, help="cleaned Parquet file")
+    parser.add_argument("--workers", type=int, default=None, help="cleaning processes (default: all cores)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    args = parser.parse_args()
+
+    report = ingest_files(args.inputs, args.output, args.workers, args.chunk_rows)
+
+    print("=" * 60)
+    print(f"Ingested {len(report['files'])} files with {report['workers']} workers")
+    print("=" * 60)
+    print(f"{'file':<30}{'read':>12}{'dropped':>12}{'duplicates':>12}{'kept':>12}{'rows/s':>12}")
+    for entry in report["files"]:
+        print(f"{os.path.basename(entry['file']):<30}{entry['rows_read']:>12,}{entry['rows_dropped']:>12,}"
+              f"{entry['duplicates']:>12,}{entry['rows_kept']:>12,}{entry['rows_per_second']:>12,.0f}")
+    print(f"{'total':<30}{report['rows_read']:>12,}{report['rows_dropped']:>12,}"
+          f"{report['duplicates']:>12,}{report['rows_kept']:>12,}{report['rows_per_second']:>12,.0f}")
+    print(f"{report['rows_kept']:,} rows -> {args.output} in {report['seconds']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
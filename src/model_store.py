@@ -0,0 +1,143 @@
+"""Shared, read-only model store for multi-process serving.
+
+``build_store`` compiles every pipeline in ``models/`` (LR, RF and XGBoost)
+once into a store directory of flat ``.npy`` arrays, by default
+``cache/model_store``; point ``--store-dir`` at a RAM-backed path such as
+``/dev/shm/medicost`` to keep it off disk. Workers call ``attach_store``,
+which memory-maps the arrays read-only: the pages sit once in the OS page
+cache and every process maps the same physical memory, with no unpickling
+and no private copy of the parameters. A model whose pickle in ``models/``
+has changed since it was compiled is refused until the store is rebuilt.
+
+Usage:
+    python -m src.model_store build [--store-dir DIR] [--force]
+    python -m src.model_store report [--workers 4] [--store-dir DIR]
+"""
+import argparse
+import glob
+import multiprocessing
+import os
+
+from src.artifacts import CACHE_DIR, MODELS_DIR, file_sha256, read_json
+from src.compiled import META_FILE, export_model, is_stale, load_compiled
+
+STORE_DIR = os.path.join(CACHE_DIR, "model_store")
+SAMPLE_QUOTE = {"age": 45, "gender": "Male", "state": "Lagos", "bmi": 31.0, "children": 2, "smoker": "Yes"}
+
+
+def model_paths(models_dir=MODELS_DIR):
+    return sorted(glob.glob(os.path.join(models_dir, "*_model_pipeline.pkl")))
+
+
+def model_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def build_store(store_dir=STORE_DIR, paths=None, force=False):
+    """Compile each model into ``store_dir/<name>``, skipping ones that are up to date."""
+    built = []
+    for path in paths or model_paths():
+        output_dir = os.path.join(store_dir, model_name(path))
+        meta_path = os.path.join(output_dir, META_FILE)
+        if not force and os.path.exists(meta_path) and read_json(meta_path)["source_sha256"] == file_sha256(path):
+            continue
+        export_model(path, output_dir)
+        built.append(model_name(path))
+    return built
+
+
+def attach_store(store_dir=STORE_DIR, models_dir=MODELS_DIR):
+    """Map every model in the store read-only; returns {name: CompiledModel}.
+
+    Raises ValueError if any model's pickle in ``models_dir`` has changed since the store was built.
+    """
+    model_dirs = [os.path.dirname(path) for path in sorted(glob.glob(os.path.join(store_dir, "*", META_FILE)))]
+    if not model_dirs:
+        raise FileNotFoundError(f"No models in store {store_dir}, run: python -m src.model_store build")
+    sources = {
+        model_dir: os.path.join(models_dir, read_json(os.path.join(model_dir, META_FILE))["source"])
+        for model_dir in model_dirs
+    }
+    stale = [os.path.basename(model_dir) for model_dir in model_dirs if is_stale(model_dir, sources[model_dir])]
+    if stale:
+        raise ValueError(f"Stale models in store {store_dir}: {', '.join(stale)}, "
+                         f"run: python -m src.model_store build --store-dir {store_dir}")
+    return {
+        os.path.basename(model_dir): load_compiled(model_dir, mmap=True, model_path=sources[model_dir])
+        for model_dir in model_dirs
+    }
+
+
+def _memory_mb(process):
+    info = process.memory_full_info()
+    return {name: round(getattr(info, name) / 2**20, 1) for name in ("rss", "uss", "pss") if hasattr(info, name)}
+
+
+def _report_worker(mode, store_dir, barrier, results):
+    import psutil
+
+    process = psutil.Process()
+    before = _memory_mb(process)
+
+    if mode == "pickle":
+        # what every worker does today: unpickle its own copy of each pipeline
+        from src.scoring import load_model, predict_bill
+
+        for path in model_paths():
+            predict_bill(SAMPLE_QUOTE, load_model(path))
+    else:
+        for model in attach_store(store_dir).values():
+            model.predict_one(SAMPLE_QUOTE)
+
+    # measure while all workers are alive, so shared pages are split between them
+    barrier.wait()
+    results.put({"mode": mode, "before": before, "after": _memory_mb(process)})
+    barrier.wait()
+
+
+def memory_report(n_workers=4, store_dir=STORE_DIR):
+    """Load the three models in ``n_workers`` processes per mode; memory per worker in MB."""
+    context = multiprocessing.get_context("spawn")
+    report = {}
+    for mode in ("pickle", "store"):
+        barrier = context.Barrier(n_workers)
+        results = context.Queue()
+        workers = [context.Process(target=_report_worker, args=(mode, store_dir, barrier, results)) for _ in range(n_workers)]
+        for worker in workers:
+            worker.start()
+        rows = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+
+        report[mode] = {
+            key: {name: round(sum(row[key][name] for row in rows) / len(rows), 1) for name in rows[0][key]}
+            for key in ("before", "after")
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared read-only model store.")
+    parser.add_argument("command", choices=["build", "report"])
+    parser.add_argument("--store-dir", default=STORE_DIR)
+    parser.add_argument("--force", action="store_true", help="build: recompile every model")
+    parser.add_argument("--workers", type=int, default=4, help="report: worker processes per mode")
+    args = parser.parse_args()
+
+    built = build_store(args.store_dir, force=args.force)
+    if args.command == "build":
+        print(f"Compiled: {', '.join(built) if built else 'all models up to date'} ({args.store_dir})")
+        return
+
+    print("=" * 60)
+    print(f"MEMORY PER WORKER ({args.workers} workers, MB)")
+    print("=" * 60)
+    report = memory_report(args.workers, args.store_dir)
+    print(f"{'mode':<8}{'':>4}{'rss':>10}{'uss':>10}{'pss':>10}")
+    for mode, stages in report.items():
+        for stage, memory in stages.items():
+            print(f"{mode:<8}{stage:>6}" + "".join(f"{memory.get(name, float('nan')):>10}" for name in ("rss", "uss", "pss")))
+
+
+if __name__ == "__main__":
+    main()
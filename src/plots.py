@@ -0,0 +1,89 @@
+"""Plotly figures whose payload stays bounded however many rows are plotted.
+
+Up to ``ROW_THRESHOLD`` rows the usual Plotly Express figures are returned.
+Above it, points and histograms are aggregated on the server with NumPy and
+only the aggregates go to the browser: histograms become bar traces of bin
+counts, and scatter plots become a 2D-binned density heatmap with a fixed
+size sample of points drawn on top in WebGL.
+"""
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+
+ROW_THRESHOLD = 20_000
+DENSITY_BINS = 200
+SAMPLE_POINTS = 2_000
+
+
+def histogram_counts(values, nbins=40, value_range=None):
+    """Bin counts and edges with NumPy, ignoring missing values."""
+    values = np.asarray(values, dtype=np.float64)
+    values = values[~np.isnan(values)]
+    return np.histogram(values, bins=nbins, range=value_range)
+
+
+def binned_histogram(counts, edges, name="count", color=None):
+    """Bar trace figure drawn from precomputed histogram bins."""
+    fig = go.Figure(go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2,
+        y=counts,
+        width=np.diff(edges),
+        name=name,
+        marker_color=color,
+        hovertext=[f"{left:,.2f} – {right:,.2f}" for left, right in zip(edges[:-1], edges[1:])],
+    ))
+    fig.update_layout(bargap=0, yaxis_title="count")
+    return fig
+
+
+def histogram(values, nbins=40, title=None, threshold=ROW_THRESHOLD):
+    if len(values) <= threshold:
+        return px.histogram(values, nbins=nbins, title=title)
+    counts, edges = histogram_counts(values, nbins)
+    fig = binned_histogram(counts, edges)
+    fig.update_layout(title=title)
+    return fig
+
+
+def _sample_index(n_rows, size, seed=0):
+    return np.sort(np.random.default_rng(seed).choice(n_rows, size=size, replace=False))
+
+
+def density_scatter(x, y, labels=None, nbins=DENSITY_BINS, sample_points=SAMPLE_POINTS):
+    """2D-binned density heatmap with a WebGL sample of the points on top."""
+    labels = labels or {}
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    finite = np.isfinite(x) & np.isfinite(y)
+    x, y = x[finite], y[finite]
+
+    counts, x_edges, y_edges = np.histogram2d(x, y, bins=nbins)
+    # empty bins stay transparent; log scale keeps sparse tails visible
+    z = np.where(counts > 0, np.log10(np.maximum(counts, 1)), np.nan).T
+    fig = go.Figure(go.Heatmap(
+        x=(x_edges[:-1] + x_edges[1:]) / 2,
+        y=(y_edges[:-1] + y_edges[1:]) / 2,
+        z=z,
+        customdata=counts.T,
+        colorscale="Blues",
+        colorbar={"title": "rows (log10)"},
+        hovertemplate="x: %{x:,.0f}<br>y: %{y:,.0f}<br>rows: %{customdata:,.0f}<extra></extra>",
+        name="density",
+    ))
+
+    sample = _sample_index(len(x), min(sample_points, len(x)))
+    fig.add_trace(go.Scattergl(
+        x=x[sample],
+        y=y[sample],
+        mode="markers",
+        marker={"size": 3, "color": "rgba(231, 76, 60, 0.5)"},
+        name=f"sample of {len(sample):,} rows",
+    ))
+    fig.update_layout(xaxis_title=labels.get("x"), yaxis_title=labels.get("y"))
+    return fig
+
+
+def scatter(x, y, labels=None, opacity=0.6, threshold=ROW_THRESHOLD):
+    if len(x) <= threshold:
+        return px.scatter(x=x, y=y, labels=labels, opacity=opacity)
+    return density_scatter(x, y, labels)
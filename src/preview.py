@@ -0,0 +1,105 @@
+"""Paginated, sortable row preview over the memory-mapped EDA dataset.
+
+``PreviewIndex`` wraps the Arrow table from ``src.columnar.load_table`` and
+reads it one record batch of ``BATCH_ROWS`` at a time, filtering each batch
+with ``src.filters.filter_mask``, so a page needs a batch and the rows on it
+in memory whatever the size of the file. A page is the slice
+``[page * page_size, (page + 1) * page_size)`` of the matching rows:
+
+* in row order, batches are read only until the page is filled;
+* sorted by a column, each batch's matching rows are merged into the first
+  ``(page + 1) * page_size`` rows of the order seen so far. Sorted pages
+  stop at ``SORTED_ROWS`` rows, which bounds that running set.
+
+Only the rows on the page are taken from the memory map and converted to
+pandas.
+"""
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from src.filters import filter_mask
+
+PAGE_SIZES = (10, 25, 50, 100)
+BATCH_ROWS = 131_072
+SORTED_ROWS = 10_000
+
+
+class PreviewIndex:
+    """Pages of rows from ``table``, in row order or sorted by a column."""
+
+    def __init__(self, table, batch_rows=BATCH_ROWS):
+        self.table = table
+        self.n_rows = table.num_rows
+        self.columns = table.column_names
+        # zero-copy slices of the memory map and the row number each starts at
+        self.batches = table.to_batches(max_chunksize=batch_rows)
+        self.offsets = np.cumsum([0] + [batch.num_rows for batch in self.batches])
+
+    def n_pages(self, n_selected, page_size, sort_by=None):
+        if sort_by is not None:
+            n_selected = min(n_selected, SORTED_ROWS)
+        return max(1, -(-n_selected // page_size))
+
+    def _rows_in_order(self, start, stop, values, ranges):
+        found = []
+        seen = 0
+        for offset, batch in zip(self.offsets, self.batches):
+            mask = filter_mask(batch, values, ranges)
+            if mask is None:
+                rows = np.arange(batch.num_rows)
+            else:
+                rows = np.flatnonzero(mask.to_numpy(zero_copy_only=False))
+            if seen + len(rows) > start:
+                found.append(offset + rows[max(start - seen, 0):stop - seen])
+            seen += len(rows)
+            if seen >= stop:
+                break
+        return np.concatenate(found) if found else np.zeros(0, dtype=np.int64)
+
+    def _rows_sorted(self, stop, values, ranges, sort_by, ascending):
+        # first ``stop`` matching rows by ``sort_by``, missing values last; the
+        # sort is stable and earlier batches come first, so ties stay in row order
+        order = "ascending" if ascending else "descending"
+        best = None
+        for offset, batch in zip(self.offsets, self.batches):
+            key = batch.column(sort_by)
+            if pa.types.is_dictionary(key.type):
+                # the store's dictionaries are sorted, so codes sort like the values
+                key = key.indices
+            candidates = pa.table({"key": key, "row": np.arange(offset, offset + batch.num_rows)})
+            mask = filter_mask(batch, values, ranges)
+            if mask is not None:
+                candidates = candidates.filter(mask)
+            if best is not None:
+                candidates = pa.concat_tables([best, candidates])
+            indices = pc.sort_indices(candidates, sort_keys=[("key", order)], null_placement="at_end")
+            best = candidates.take(indices[:stop])
+        return best["row"].to_numpy() if best is not None else np.zeros(0, dtype=np.int64)
+
+    def page_rows(self, page, page_size, values=None, ranges=None, sort_by=None, ascending=True):
+        """Row indices on ``page`` of the rows matching ``values`` and ``ranges``."""
+        start = page * page_size
+        stop = start + page_size
+        if sort_by is None:
+            return self._rows_in_order(start, stop, values, ranges)
+        stop = min(stop, SORTED_ROWS)
+        return self._rows_sorted(stop, values, ranges, sort_by, ascending)[start:stop]
+
+    def _take(self, rows):
+        # rows taken batch by batch, so no column of the map is concatenated
+        which = np.searchsorted(self.offsets, rows, side="right") - 1
+        grouped = np.argsort(which, kind="stable")
+        parts = [
+            self.batches[i].take(pa.array(rows[grouped][which[grouped] == i] - self.offsets[i]))
+            for i in np.unique(which)
+        ]
+        frame = pa.Table.from_batches(parts, schema=self.table.schema).to_pandas()
+        return frame.iloc[np.argsort(grouped)]
+
+    def page(self, page, page_size, values=None, ranges=None, sort_by=None, ascending=True):
+        """DataFrame of the rows on ``page``, indexed by their row number in the dataset."""
+        rows = self.page_rows(page, page_size, values, ranges, sort_by, ascending)
+        frame = self._take(rows)
+        frame.index = rows
+        return frame
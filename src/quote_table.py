@@ -0,0 +1,163 @@
+"""Precomputed prediction table over the predictor form's input domain.
+
+The form only accepts whole ages 20-85, children 0-10 and a handful of
+gender/state/smoker options, and BMI moves in 1.0 steps by default. The
+whole grid (about 1.6M cells) is scored once and stored as a dense,
+memory-mapped float32 array, so a quote on a grid point is a single array
+lookup. Anything off the grid (e.g. BMI 22.5) falls back to the live model.
+
+The table records the SHA-256 of the model pickle it was built from and is
+ignored once the pickle changes.
+
+Usage:
+    python -m src.quote_table [--bmi-step 1.0] [--output cache/quote_table]
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from src.artifacts import CACHE_DIR, file_sha256, read_json, write_json
+from src.features import AGE_RANGE, BMI_RANGE, CHILDREN_RANGE, GENDER_OPTIONS, SMOKER_OPTIONS, STATE_OPTIONS
+from src.scoring import XG_MODEL_PATH, load_scorer
+
+QUOTE_TABLE_DIR = os.path.join(CACHE_DIR, "quote_table")
+TABLE_FILE = "predictions.npy"
+META_FILE = "meta.json"
+
+# axis order of the table
+NUMERIC_AXES = ["age", "bmi", "children"]
+CATEGORICAL_AXES = ["gender", "state", "smoker"]
+BUILD_CHUNK_SIZE = 250_000
+
+
+def grid_axes(bmi_step=1.0):
+    n_bmi = int(round((BMI_RANGE[1] - BMI_RANGE[0]) / bmi_step)) + 1
+    return {
+        "age": {"start": AGE_RANGE[0], "step": 1, "size": AGE_RANGE[1] - AGE_RANGE[0] + 1},
+        "bmi": {"start": BMI_RANGE[0], "step": bmi_step, "size": n_bmi},
+        "children": {"start": CHILDREN_RANGE[0], "step": 1, "size": CHILDREN_RANGE[1] - CHILDREN_RANGE[0] + 1},
+        "gender": {"values": GENDER_OPTIONS},
+        "state": {"values": STATE_OPTIONS},
+        "smoker": {"values": SMOKER_OPTIONS},
+    }
+
+
+def _axis_values(axis):
+    if "values" in axis:
+        return np.asarray(axis["values"], dtype=object)
+    return axis["start"] + axis["step"] * np.arange(axis["size"])
+
+
+def build_quote_table(model_path=XG_MODEL_PATH, output_dir=QUOTE_TABLE_DIR, bmi_step=1.0):
+    print("=" * 60)
+    print("BUILDING QUOTE TABLE")
+    print("=" * 60)
+
+    scorer = load_scorer(model_path)
+    axes = grid_axes(bmi_step)
+    axis_names = NUMERIC_AXES + CATEGORICAL_AXES
+    axis_values = [_axis_values(axes[name]) for name in axis_names]
+    shape = tuple(len(values) for values in axis_values)
+    n_cells = int(np.prod(shape))
+    print(f"Grid shape {shape}: {n_cells:,} cells")
+
+    os.makedirs(output_dir, exist_ok=True)
+    tmp_path = os.path.join(output_dir, f"{TABLE_FILE}.tmp")
+    table = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(n_cells,))
+
+    # walk the flat cell index in chunks and decode it back into one column per axis
+    start_time = time.perf_counter()
+    for start in range(0, n_cells, BUILD_CHUNK_SIZE):
+        cells = np.arange(start, min(start + BUILD_CHUNK_SIZE, n_cells))
+        positions = np.unravel_index(cells, shape)
+        columns = {name: values[pos] for name, values, pos in zip(axis_names, axis_values, positions)}
+        table[start:start + len(cells)] = scorer.predict_many(columns)
+
+    table.flush()
+    del table
+    os.replace(tmp_path, os.path.join(output_dir, TABLE_FILE))
+    elapsed = time.perf_counter() - start_time
+
+    write_json(os.path.join(output_dir, META_FILE), {
+        "model_path": os.path.basename(model_path),
+        "model_sha256": file_sha256(model_path),
+        "axis_order": axis_names,
+        "axes": axes,
+        "shape": list(shape),
+        "dtype": "float32",
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    })
+    print(f"Scored {n_cells:,} cells in {elapsed:.2f}s ({n_cells / elapsed:,.0f} cells/s)")
+    print(f"Quote table saved to {output_dir}")
+
+    return output_dir
+
+
+class QuoteTable:
+    """Memory-mapped prediction table with O(1) lookups for on-grid quotes."""
+
+    def __init__(self, table_dir):
+        self.meta = read_json(os.path.join(table_dir, META_FILE))
+        self.shape = tuple(self.meta["shape"])
+        self.values = np.load(os.path.join(table_dir, TABLE_FILE), mmap_mode="r").reshape(self.shape)
+        self._numeric = [self.meta["axes"][name] for name in NUMERIC_AXES]
+        self._categorical = [
+            {value: i for i, value in enumerate(self.meta["axes"][name]["values"])}
+            for name in CATEGORICAL_AXES
+        ]
+
+    def index(self, quote):
+        """Return the cell index for a quote, or None if it is off the grid."""
+        index = []
+        for name, axis in zip(NUMERIC_AXES, self._numeric):
+            value = quote.get(name)
+            if value is None or value != value:
+                return None
+            position = (float(value) - axis["start"]) / axis["step"]
+            rounded = round(position)
+            if abs(position - rounded) > 1e-9 or not 0 <= rounded < axis["size"]:
+                return None
+            index.append(rounded)
+
+        for name, lookup in zip(CATEGORICAL_AXES, self._categorical):
+            position = lookup.get(quote.get(name))
+            if position is None:
+                return None
+            index.append(position)
+
+        return tuple(index)
+
+    def lookup(self, quote):
+        index = self.index(quote)
+        return None if index is None else float(self.values[index])
+
+    def predict(self, quote, scorer):
+        # table hit, or the live model for anything off the grid
+        value = self.lookup(quote)
+        return value if value is not None else scorer.predict_one(quote)
+
+
+def load_quote_table(table_dir=QUOTE_TABLE_DIR, model_path=XG_MODEL_PATH):
+    """Open the quote table, or return None if it is missing or stale."""
+    meta_path = os.path.join(table_dir, META_FILE)
+    if not os.path.exists(meta_path) or not os.path.exists(os.path.join(table_dir, TABLE_FILE)):
+        return None
+    if read_json(meta_path)["model_sha256"] != file_sha256(model_path):
+        return None
+    return QuoteTable(table_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute predictions for the quote form input grid.")
+    parser.add_argument("--model", default=XG_MODEL_PATH, help="model pipeline pickle")
+    parser.add_argument("--output", default=QUOTE_TABLE_DIR, help="output directory")
+    parser.add_argument("--bmi-step", type=float, default=1.0, help="BMI grid step")
+    args = parser.parse_args()
+
+    build_quote_table(args.model, args.output, args.bmi_step)
+
+
+if __name__ == "__main__":
+    main()
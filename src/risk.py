@@ -0,0 +1,94 @@
+"""Rule-based risk banding used alongside the bill prediction."""
+import numpy as np
+import pandas as pd
+
+# risk codes index into these; labels and emoji are only looked up for display
+RISK_LEVELS = ["Low", "Medium", "High"]
+RISK_COLORS = ["🟢", "🟡", "🔴"]
+
+
+def calculate_risk(age, bmi, smoker):
+    score = 0
+
+    # Age scoring
+    if age < 30:
+        score += 0
+    elif 30 <= age <= 50:
+        score += 1
+    else:
+        score += 2
+
+    # BMI scoring
+    if bmi < 25:
+        score += 0
+    elif 25 <= bmi <= 30:
+        score += 1
+    else:
+        score += 2
+
+    # Smoker scoring
+    if smoker == "Yes":
+        score += 3
+
+    # Determine risk level
+    if score <= 2:
+        risk_level = "Low"
+        risk_color = "🟢"
+    elif score <= 4:
+        risk_level = "Medium"
+        risk_color = "🟡"
+    else:
+        risk_level = "High"
+        risk_color = "🔴"
+
+    risk = {
+            "risk_level": risk_level,
+            "risk_color": risk_color
+    }
+
+    return risk
+
+
+def _float_values(values):
+    if hasattr(values, "to_numpy"):
+        return values.to_numpy(dtype=np.float64, na_value=np.nan)
+    return np.asarray(values, dtype=np.float64)
+
+
+def _is_smoker(smoker):
+    # compare category codes instead of every string when the column is categorical
+    if isinstance(getattr(smoker, "dtype", None), pd.CategoricalDtype):
+        categories = list(smoker.cat.categories)
+        if "Yes" not in categories:
+            return np.zeros(len(smoker), dtype=bool)
+        return smoker.cat.codes.to_numpy() == categories.index("Yes")
+    return np.asarray(smoker, dtype=object) == "Yes"
+
+
+def risk_codes(age, bmi, smoker):
+    """Array version of ``calculate_risk`` returning int8 codes into RISK_LEVELS.
+
+    Takes NumPy arrays or pandas columns and applies the same age, BMI and
+    smoker scoring, so every row lands in the same band as the scalar version
+    (missing age or BMI scores like the top band, as it does there).
+    """
+    age = _float_values(age)
+    bmi = _float_values(bmi)
+
+    score = np.where(age < 30, 0, np.where(age <= 50, 1, 2)).astype(np.int8)
+    score += np.where(bmi < 25, 0, np.where(bmi <= 30, 1, 2)).astype(np.int8)
+    score += np.where(_is_smoker(smoker), 3, 0).astype(np.int8)
+
+    return (score > 2).astype(np.int8) + (score > 4)
+
+
+def risk_labels(codes):
+    return pd.Categorical.from_codes(codes, categories=RISK_LEVELS)
+
+
+def risk_colors(codes):
+    return np.asarray(RISK_COLORS, dtype=object)[codes]
+
+
+def risk_counts(codes):
+    return pd.Series(np.bincount(codes, minlength=len(RISK_LEVELS)), index=RISK_LEVELS)
@@ -0,0 +1,89 @@
+"""Headless scoring engine for the medical bill model pipelines.
+
+Nothing in here depends on Streamlit, so the same code serves the app pages,
+batch jobs and other internal systems. Errors are raised, not displayed.
+"""
+import functools
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.artifacts import MODELS_DIR
+from src.features import FeatureEncoder, build_feature_spec
+from src.trees import from_sklearn_forest, from_xgboost
+
+XG_MODEL_PATH = os.path.join(MODELS_DIR, "xg_model_pipeline.pkl")
+
+
+@functools.lru_cache(maxsize=None)
+def load_model(path=XG_MODEL_PATH):
+    return joblib.load(path)
+
+
+@functools.lru_cache(maxsize=None)
+def load_scorer(path=XG_MODEL_PATH):
+    return QuoteScorer(load_model(path))
+
+
+def predict_bill(patient_data, model):
+    # reference path through the full sklearn pipeline
+    input_df = pd.DataFrame([patient_data])
+    return model.predict(input_df)[0]
+
+
+class QuoteScorer:
+    """Score quotes without going through pandas and the ColumnTransformer.
+
+    The fitted preprocessor is turned into a ``FeatureEncoder`` once; single
+    quotes are then written straight into a preallocated feature row laid out
+    like ``preprocessor.get_feature_names_out()``. Predictions are identical
+    to ``model.predict``.
+
+    ``predict_one`` reuses its row buffer and is not thread-safe; use one
+    scorer per thread or ``predict_many`` for shared use.
+
+    For XGBoost models ``booster`` is the fitted booster and
+    ``iteration_range`` the rounds used for prediction (up to the best
+    iteration when early stopping ran); both are None for other estimators.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.preprocessor = model.named_steps["preprocessor"]
+        self.estimator = model.steps[-1][1]
+        self.encoder = FeatureEncoder(build_feature_spec(self.preprocessor))
+        self.feature_names = self.encoder.feature_names
+        self._row = np.zeros((1, self.encoder.n_features), dtype=np.float64)
+
+        # tree models: batches go to the library, single rows to a NumPy copy
+        # of the trees, which avoids the library's per-call overhead
+        self.booster = None
+        self.iteration_range = None
+        self.trees = None
+        if hasattr(self.estimator, "get_booster"):
+            self.booster = self.estimator.get_booster()
+            best_iteration = getattr(self.estimator, "best_iteration", None)
+            n_rounds = best_iteration + 1 if best_iteration is not None else self.booster.num_boosted_rounds()
+            self.iteration_range = (0, n_rounds)
+            self.trees = from_xgboost(self.booster, self.iteration_range)
+        elif type(self.estimator).__name__ in ("RandomForestRegressor", "ExtraTreesRegressor"):
+            self.trees = from_sklearn_forest(self.estimator)
+
+    def encode(self, data):
+        return self.encoder.encode_columns(data)
+
+    def predict_features(self, X):
+        if self.booster is not None:
+            return self.booster.inplace_predict(X, iteration_range=self.iteration_range)
+        return self.estimator.predict(X)
+
+    def predict_one(self, patient_data):
+        self.encoder.encode_row(patient_data, self._row[0])
+        if self.trees is not None:
+            return float(self.trees.predict_row(self._row[0]))
+        return float(self.predict_features(self._row)[0])
+
+    def predict_many(self, data):
+        return self.predict_features(self.encode(data))
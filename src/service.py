@@ -0,0 +1,388 @@
+"""Local HTTP/JSON scoring service with request micro-batching.
+
+Single-quote requests that arrive within ``max_wait_ms`` of each other are
+coalesced into one batched prediction (up to ``max_batch_size`` quotes), so
+throughput under concurrent load is bounded by batched model calls rather
+than per-request overhead. Built on asyncio streams only.
+
+Endpoints:
+    POST /predict   {"age": 45, "gender": "Male", "state": "Lagos", "bmi": 31.0, "children": 2, "smoker": "Yes"}
+    GET  /stats     latency percentiles, throughput and batch sizes
+    GET  /health
+
+Usage:
+    python -m src.service serve [--host 127.0.0.1] [--port 8765] [--max-batch-size 64] [--max-wait-ms 2]
+    python -m src.service bench [--requests 20000] [--concurrency 64]
+"""
+import argparse
+import asyncio
+import collections
+import json
+import time
+
+import numpy as np
+
+from src.features import (
+    AGE_RANGE, BMI_RANGE, CATEGORICAL_FEATURES, CHILDREN_RANGE, GENDER_OPTIONS, INPUT_COLUMNS,
+    NUMERICAL_FEATURES, SMOKER_OPTIONS, STATE_OPTIONS, is_nan,
+)
+from src.risk import RISK_COLORS, RISK_LEVELS, risk_codes
+from src.scoring import XG_MODEL_PATH, load_scorer
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_MAX_BATCH_SIZE = 64
+DEFAULT_MAX_WAIT_MS = 2.0
+MAX_BODY_BYTES = 1 << 20
+
+NUMERIC_RANGES = {"age": AGE_RANGE, "bmi": BMI_RANGE, "children": CHILDREN_RANGE}
+# numeric inputs of the risk band, which has no rule for missing values
+RISK_FEATURES = ("age", "bmi")
+CATEGORY_OPTIONS = {"gender": GENDER_OPTIONS, "smoker": SMOKER_OPTIONS, "state": STATE_OPTIONS}
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+def validate_quote(quote):
+    """The quote's input columns, checked like the predictor page's batch upload.
+
+    Numbers must lie in the form's ranges and text fields be one of its
+    options; children and gender may be missing (None) and are imputed by
+    the pipeline. The other fields may not: the risk band is read from age,
+    bmi and smoker, and a missing age or bmi would silently band as "High".
+    Raises ValueError with every problem found.
+    """
+    if not isinstance(quote, dict):
+        raise ValueError("Request body must be a JSON object")
+    missing = [column for column in INPUT_COLUMNS if column not in quote]
+    if missing:
+        raise ValueError(f"Missing field(s): {', '.join(missing)}")
+
+    cleaned = {}
+    errors = []
+    for column in NUMERICAL_FEATURES:
+        value = quote[column]
+        if (value is None or is_nan(value)) and column in RISK_FEATURES:
+            errors.append(f"{column} is required")
+        elif value is None or is_nan(value):
+            cleaned[column] = None
+        elif isinstance(value, bool) or not isinstance(value, (int, float)):
+            errors.append(f"{column} must be a number")
+        elif not NUMERIC_RANGES[column][0] <= value <= NUMERIC_RANGES[column][1]:
+            errors.append(f"{column} must be between {NUMERIC_RANGES[column][0]} and {NUMERIC_RANGES[column][1]}")
+        else:
+            cleaned[column] = value
+    for column in CATEGORICAL_FEATURES:
+        value = quote[column]
+        if column == "gender" and (value is None or is_nan(value)):
+            # missing gender is imputed, which needs NaN rather than None
+            cleaned[column] = np.nan
+        elif not isinstance(value, str) or value.strip() not in CATEGORY_OPTIONS[column]:
+            errors.append(f"{column} must be one of {', '.join(CATEGORY_OPTIONS[column])}")
+        else:
+            cleaned[column] = value.strip()
+    if errors:
+        raise ValueError("; ".join(errors))
+    return {column: cleaned[column] for column in INPUT_COLUMNS}
+
+
+class LatencyStats:
+    """Rolling request latencies plus counters since start."""
+
+    def __init__(self, window=100_000):
+        self.latencies = collections.deque(maxlen=window)
+        self.started_at = time.perf_counter()
+        self.requests = 0
+        self.batches = 0
+        self.batched_quotes = 0
+
+    def record_request(self, seconds):
+        self.latencies.append(seconds)
+        self.requests += 1
+
+    def record_batch(self, size):
+        self.batches += 1
+        self.batched_quotes += size
+
+    def snapshot(self):
+        elapsed = time.perf_counter() - self.started_at
+        latencies_ms = np.asarray(self.latencies) * 1000
+        p50, p99 = np.percentile(latencies_ms, [50, 99]) if len(latencies_ms) else (0.0, 0.0)
+        return {
+            "requests": self.requests,
+            "uptime_s": round(elapsed, 3),
+            "throughput_rps": round(self.requests / elapsed, 1) if elapsed else 0.0,
+            "latency_p50_ms": round(float(p50), 3),
+            "latency_p99_ms": round(float(p99), 3),
+            "batches": self.batches,
+            "mean_batch_size": round(self.batched_quotes / self.batches, 2) if self.batches else 0.0,
+        }
+
+
+class MicroBatcher:
+    """Collect concurrent quotes and score them with one batched call."""
+
+    def __init__(self, scorer, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS, stats=None):
+        self.scorer = scorer
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.stats = stats or LatencyStats()
+        self._queue = asyncio.Queue()
+        self._worker = None
+
+    def start(self):
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, quote):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((quote, future))
+        return await future
+
+    async def _collect(self):
+        # block for the first quote, then take whatever arrives before the deadline
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _score(self, quotes):
+        columns = {column: [quote[column] for quote in quotes] for column in INPUT_COLUMNS}
+        bills = self.scorer.predict_many(columns)
+        codes = risk_codes(columns["age"], columns["bmi"], columns["smoker"])
+        return [
+            {"predicted_bill": float(bill), "risk_level": RISK_LEVELS[code], "risk_color": RISK_COLORS[code]}
+            for bill, code in zip(bills, codes)
+        ]
+
+    def _score_each(self, quotes):
+        # a result per quote, or the exception scoring it raised
+        results = []
+        for quote in quotes:
+            try:
+                results.append(self._score([quote])[0])
+            except Exception as e:
+                results.append(e)
+        return results
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            quotes = [quote for quote, _ in batch]
+            try:
+                # predict off the event loop so new requests keep queueing meanwhile
+                results = await loop.run_in_executor(None, self._score, quotes)
+            except Exception:
+                # one bad quote must not fail the others: score them one at a time
+                results = await loop.run_in_executor(None, self._score_each, quotes)
+
+            self.stats.record_batch(len(batch))
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+
+class ScoringServer:
+    """Minimal HTTP/1.1 JSON server (keep-alive, Content-Length bodies)."""
+
+    def __init__(self, batcher, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.batcher = batcher
+        self.host = host
+        self.port = port
+        self._server = None
+
+    async def start(self):
+        self.batcher.start()
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+        await self.batcher.stop()
+
+    async def serve_forever(self):
+        await self.start()
+        print(f"Scoring service listening on http://{self.host}:{self.port}")
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def _route(self, method, path, body):
+        if path == "/health":
+            return 200, {"status": "ok"}
+        if path == "/stats":
+            return 200, self.batcher.stats.snapshot()
+        if path != "/predict":
+            return 404, {"error": f"Unknown path: {path}"}
+        if method != "POST":
+            return 405, {"error": "Use POST"}
+
+        started = time.perf_counter()
+        try:
+            quote = validate_quote(json.loads(body or b"null"))
+        except ValueError as e:
+            return 400, {"error": str(e)}
+        result = await self.batcher.submit(quote)
+        self.batcher.stats.record_request(time.perf_counter() - started)
+        return 200, result
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY_BYTES:
+                    status, payload = 413, {"error": "Request body too large"}
+                    body = None
+                else:
+                    body = await reader.readexactly(length) if length else b""
+                    try:
+                        status, payload = await self._route(method, path.split("?", 1)[0], body)
+                    except Exception as e:
+                        status, payload = 500, {"error": str(e)}
+
+                data = json.dumps(payload).encode("utf-8")
+                keep_alive = headers.get("connection", "").lower() != "close" and body is not None
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _client(host, port, quotes, latencies):
+    # one keep-alive connection sending its share of the requests back to back
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for quote in quotes:
+            body = json.dumps(quote).encode("utf-8")
+            started = time.perf_counter()
+            writer.write(
+                f"POST /predict HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+            await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - started)
+    finally:
+        writer.close()
+
+
+def _random_quotes(n, seed=42):
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "age": int(rng.integers(AGE_RANGE[0], AGE_RANGE[1] + 1)),
+            "gender": str(rng.choice(GENDER_OPTIONS)),
+            "state": str(rng.choice(STATE_OPTIONS)),
+            "bmi": round(float(rng.uniform(*BMI_RANGE)), 1),
+            "children": int(rng.integers(CHILDREN_RANGE[0], CHILDREN_RANGE[1] + 1)),
+            "smoker": str(rng.choice(SMOKER_OPTIONS)),
+        }
+        for _ in range(n)
+    ]
+
+
+async def run_benchmark(scorer, requests=20_000, concurrency=64, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+    """Start a server on an ephemeral localhost port and load it with concurrent clients."""
+    server = ScoringServer(MicroBatcher(scorer, max_batch_size, max_wait_ms), port=0)
+    await server.start()
+
+    quotes = _random_quotes(requests)
+    latencies = []
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        _client(server.host, server.port, quotes[i::concurrency], latencies)
+        for i in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - started
+    server_stats = server.batcher.stats.snapshot()
+    await server.stop()
+
+    p50, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 99])
+    return {
+        "requests": len(latencies),
+        "concurrency": concurrency,
+        "max_batch_size": max_batch_size,
+        "max_wait_ms": max_wait_ms,
+        "client_latency_p50_ms": round(float(p50), 3),
+        "client_latency_p99_ms": round(float(p99), 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "server": server_stats,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local HTTP scoring service with micro-batching.")
+    parser.add_argument("command", choices=["serve", "bench"])
+    parser.add_argument("--model", default=XG_MODEL_PATH, help="model pipeline pickle")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--max-batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS)
+    parser.add_argument("--requests", type=int, default=20_000, help="bench: total requests")
+    parser.add_argument("--concurrency", type=int, default=64, help="bench: concurrent connections")
+    args = parser.parse_args()
+
+    scorer = load_scorer(args.model)
+    if args.command == "serve":
+        batcher = MicroBatcher(scorer, args.max_batch_size, args.max_wait_ms)
+        asyncio.run(ScoringServer(batcher, args.host, args.port).serve_forever())
+    else:
+        print("=" * 60)
+        print("SCORING SERVICE BENCHMARK")
+        print("=" * 60)
+        report = asyncio.run(run_benchmark(scorer, args.requests, args.concurrency, args.max_batch_size, args.max_wait_ms))
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
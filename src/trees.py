@@ -0,0 +1,203 @@
+"""Flat-array tree ensembles evaluated with NumPy.
+
+All trees are concatenated into flat node arrays (feature, threshold, left,
+right, value, default_left) plus the index of each tree's root. Nodes are
+renumbered so the two children of a split are always adjacent
+(``right == left + 1``), and leaves loop back to themselves and always send
+rows "left". Walking ``max_depth`` levels with ``node = left[node] + go_right``
+therefore lands every row on its leaf, using only the stored arrays, so
+memory-mapped artifacts are used as-is without per-process copies.
+"""
+import json
+
+import numpy as np
+
+# node arrays written to / read from compiled model artifacts
+ARRAY_FIELDS = ("feature", "threshold", "left", "right", "value", "default_left", "roots")
+
+# objectives whose prediction is the raw margin
+IDENTITY_OBJECTIVES = ("reg:squarederror", "reg:squaredlogerror", "reg:pseudohubererror", "reg:absoluteerror", "reg:quantileerror")
+
+
+class TreeEnsemble:
+    """A tree ensemble: prediction = base_score + sum (or mean) of tree leaves.
+
+    ``split_rule`` is ``"lt"`` for XGBoost (go left when ``x < threshold``) or
+    ``"le"`` for sklearn (``x <= threshold``). Features are compared as float32
+    against thresholds in their stored dtype, and leaves are added up one tree
+    after another in the dtype of ``value``, which reproduces both libraries'
+    predictions exactly. Missing features follow ``default_left``.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, default_left, roots, base_score=0.0,
+                 max_depth=0, split_rule="lt", average=False):
+        self.feature = np.asarray(feature)
+        self.threshold = np.asarray(threshold)
+        self.left = np.asarray(left)
+        self.right = np.asarray(right)
+        self.value = np.asarray(value)
+        self.default_left = np.asarray(default_left)
+        self.roots = np.asarray(roots)
+        self.base_score = self.value.dtype.type(base_score)
+        self.max_depth = int(max_depth)
+        self.split_rule = split_rule
+        self.average = average
+        self.n_trees = len(self.roots)
+
+    def arrays(self):
+        return {name: getattr(self, name) for name in ARRAY_FIELDS}
+
+    def params(self):
+        return {"base_score": float(self.base_score), "max_depth": self.max_depth,
+                "split_rule": self.split_rule, "average": self.average}
+
+    def _go_right(self, x, node):
+        threshold = self.threshold[node]
+        return ~(x < threshold) if self.split_rule == "lt" else ~(x <= threshold)
+
+    def _walk(self, X):
+        # X is float32 with shape (n_rows, n_features); returns leaf values (n_trees, n_rows)
+        n_rows, n_features = X.shape
+        flat_X = X.ravel()
+        has_missing = bool(np.isnan(flat_X).any())
+        row_offset = np.arange(n_rows, dtype=np.int32) * np.int32(n_features)
+        node = np.broadcast_to(self.roots[:, None], (self.n_trees, n_rows))
+
+        for _ in range(self.max_depth):
+            x = flat_X[row_offset + self.feature[node]]
+            go_right = self._go_right(x, node)
+            if has_missing:
+                go_right = np.where(np.isnan(x), ~self.default_left[node], go_right)
+            node = self.left[node] + go_right
+
+        return self.value[node]
+
+    def _finish(self, total):
+        return total / self.value.dtype.type(self.n_trees) if self.average else total
+
+    def predict(self, X, chunk_size=2048):
+        X = np.asarray(X, dtype=np.float32)
+        out = np.empty(X.shape[0], dtype=self.value.dtype)
+        for start in range(0, X.shape[0], chunk_size):
+            total = np.full(min(chunk_size, X.shape[0] - start), self.base_score, dtype=self.value.dtype)
+            for tree_leaves in self._walk(X[start:start + chunk_size]):
+                total += tree_leaves
+            out[start:start + chunk_size] = self._finish(total)
+        return out
+
+    def predict_row(self, x):
+        """Predict a single 1-D feature row."""
+        x = np.asarray(x, dtype=np.float32)
+        node = self.roots
+
+        for _ in range(self.max_depth):
+            value = x[self.feature[node]]
+            go_right = self._go_right(value, node)
+            go_right = np.where(np.isnan(value), ~self.default_left[node], go_right)
+            node = self.left[node] + go_right
+
+        leaves = np.concatenate(([self.base_score], self.value[node]))
+        return self._finish(leaves.cumsum(dtype=self.value.dtype)[-1])
+
+
+def pack_trees(trees, threshold_dtype, value_dtype):
+    """Concatenate per-tree node lists into the flat layout used by TreeEnsemble.
+
+    Each tree is a dict of equal-length sequences ``left``, ``right`` (-1 for
+    leaves), ``feature``, ``threshold``, ``value`` and ``default_left`` in the
+    source library's numbering.
+    """
+    feature, threshold, left, right, value, default_left, roots = [], [], [], [], [], [], []
+    max_depth = 0
+
+    for tree in trees:
+        offset = len(feature)
+        roots.append(offset)
+        # breadth-first renumbering that hands out child ids in adjacent pairs
+        order, new_id, depth = [0], {0: offset}, {0: 0}
+        for source in order:
+            if tree["left"][source] != -1:
+                for child in (tree["left"][source], tree["right"][source]):
+                    new_id[child] = offset + len(new_id)
+                    depth[child] = depth[source] + 1
+                    order.append(child)
+
+        for source in order:
+            node = new_id[source]
+            if tree["left"][source] == -1:
+                feature.append(0)
+                threshold.append(np.inf)
+                left.append(node)
+                right.append(node)
+                value.append(tree["value"][source])
+                default_left.append(True)
+            else:
+                feature.append(tree["feature"][source])
+                threshold.append(tree["threshold"][source])
+                left.append(new_id[tree["left"][source]])
+                right.append(new_id[tree["right"][source]])
+                value.append(0.0)
+                default_left.append(bool(tree["default_left"][source]))
+        max_depth = max(max_depth, max(depth.values()))
+
+    arrays = {
+        "feature": np.asarray(feature, dtype=np.int32),
+        "threshold": np.asarray(threshold, dtype=threshold_dtype),
+        "left": np.asarray(left, dtype=np.int32),
+        "right": np.asarray(right, dtype=np.int32),
+        "value": np.asarray(value, dtype=value_dtype),
+        "default_left": np.asarray(default_left, dtype=bool),
+        "roots": np.asarray(roots, dtype=np.int32),
+    }
+    return arrays, max_depth
+
+
+def from_xgboost(booster, iteration_range=None):
+    """Build a TreeEnsemble from a fitted ``xgboost.Booster``."""
+    model = json.loads(booster.save_raw("json"))
+    learner = model["learner"]
+
+    if learner["objective"]["name"] not in IDENTITY_OBJECTIVES:
+        raise ValueError(f"Unsupported objective: {learner['objective']['name']}")
+    if learner["gradient_booster"]["name"] != "gbtree":
+        raise ValueError(f"Unsupported booster: {learner['gradient_booster']['name']}")
+
+    gbtree = learner["gradient_booster"]["model"]
+    trees = gbtree["trees"]
+    if iteration_range is not None:
+        per_round = int(gbtree["gbtree_model_param"]["num_parallel_tree"])
+        trees = trees[iteration_range[0] * per_round:iteration_range[1] * per_round]
+    if any(any(tree["split_type"]) for tree in trees):
+        raise ValueError("Categorical splits are not supported")
+
+    # xgboost stores the leaf value in split_conditions of leaf nodes
+    arrays, max_depth = pack_trees(
+        [
+            {"left": tree["left_children"], "right": tree["right_children"], "feature": tree["split_indices"],
+             "threshold": tree["split_conditions"], "value": tree["split_conditions"], "default_left": tree["default_left"]}
+            for tree in trees
+        ],
+        threshold_dtype=np.float32,
+        value_dtype=np.float32,
+    )
+    base_score = float(learner["learner_model_param"]["base_score"].strip("[]"))
+    return TreeEnsemble(base_score=base_score, max_depth=max_depth, split_rule="lt", **arrays)
+
+
+def from_sklearn_forest(forest):
+    """Build a TreeEnsemble from a fitted sklearn RandomForest/ExtraTrees regressor."""
+    if forest.n_outputs_ != 1:
+        raise ValueError("Only single-output forests are supported")
+
+    trees = []
+    for estimator in forest.estimators_:
+        tree = estimator.tree_
+        trees.append({
+            "left": tree.children_left, "right": tree.children_right, "feature": tree.feature,
+            "threshold": tree.threshold, "value": tree.value[:, 0, 0],
+            "default_left": tree.missing_go_to_left if hasattr(tree, "missing_go_to_left") else np.zeros(tree.node_count),
+        })
+
+    # sklearn averages the trees in float64, comparing float32 features to float64 thresholds
+    arrays, max_depth = pack_trees(trees, threshold_dtype=np.float64, value_dtype=np.float64)
+    return TreeEnsemble(base_score=0.0, max_depth=max_depth, split_rule="le", average=True, **arrays)
@@ -0,0 +1,39 @@
+"""What-if sensitivity curves for a single applicant.
+
+Every variant (age 20-85, BMI 15-50, children 0-10, each smoker status and
+state) is built into one frame and scored with a single batched prediction.
+"""
+import numpy as np
+import pandas as pd
+
+from src.features import (
+    AGE_RANGE, BMI_RANGE, CHILDREN_RANGE, INPUT_COLUMNS, SMOKER_OPTIONS, STATE_OPTIONS
+)
+
+BMI_STEP = 0.5
+SWEEPS = {
+    "age": np.arange(AGE_RANGE[0], AGE_RANGE[1] + 1),
+    "bmi": np.arange(BMI_RANGE[0], BMI_RANGE[1] + BMI_STEP / 2, BMI_STEP),
+    "children": np.arange(CHILDREN_RANGE[0], CHILDREN_RANGE[1] + 1),
+    "smoker": np.asarray(SMOKER_OPTIONS, dtype=object),
+    "state": np.asarray(STATE_OPTIONS, dtype=object),
+}
+
+
+def build_variants(patient_data):
+    """One row per variant: the applicant with a single field changed."""
+    blocks = []
+    for variable, values in SWEEPS.items():
+        block = pd.DataFrame({column: [patient_data[column]] * len(values) for column in INPUT_COLUMNS})
+        block[variable] = values
+        block["variable"] = variable
+        block["value"] = values
+        blocks.append(block)
+
+    return pd.concat(blocks, ignore_index=True)
+
+
+def sensitivity_curves(patient_data, scorer):
+    variants = build_variants(patient_data)
+    variants["predicted_bill"] = scorer.predict_many(variants[INPUT_COLUMNS])
+    return variants